@@ -3,12 +3,15 @@
 import asyncio
 import json
 import logging
+import time
 from typing import Any
 from openai import AsyncOpenAI, RateLimitError
 
 from src.models import AIConfig, NewsItem
 from src.constants import DefaultScores
 from src.exceptions import ContentFilterError
+from .prompt_engine import PromptEngine
+from .result_processor import json_loads
 
 logger = logging.getLogger(__name__)
 
@@ -29,27 +32,43 @@ class BatchProvider:
         if not self.provider_config:
             raise ValueError(f"未找到提供商配置: {config.provider}")
 
-        # 主提供商客户端
-        self._client = AsyncOpenAI(
-            api_key=self.provider_config.api_key,
-            base_url=self.provider_config.base_url
-        )
+        # 主提供商客户端（首次请求时创建，未获取到新闻的运行无需建立HTTP客户端）
+        self._client: AsyncOpenAI | None = None
         self.model = self.provider_config.model
         self.api_call_count = 0
+
+        # 默认调用参数（初始化时解析一次，保证同一次运行中所有批次参数一致）
+        self._default_max_tokens = self.provider_config.max_tokens
+        self._default_temperature = self.provider_config.temperature
+        self._default_timeout = config.timeout_seconds
         self._prompt_engine = None  # 延迟加载PromptEngine
         
-        # Fallback 客户端缓存
+        # Fallback 客户端缓存；可用回退链（已过滤掉未配置的提供商）初始化时解析一次
         self._fallback_clients: dict[str, AsyncOpenAI] = {}
+        self._fallback_names = tuple(
+            name for name in config.fallback_chain if name in config.providers_config
+        )
+        # 子批次基准大小缓存（由配置决定，首次细分时解析）
+        self._base_sub_batch_size: int | None = None
 
-        # 速率限制
+        # 速率限制（RPM请求间隔 + 可选TPM令牌桶），锁保证并发批次按顺序预约请求时间
+        self._rate_limit_lock = asyncio.Lock()
         self._last_request_time = 0.0
         self._min_request_interval = self._calculate_min_interval()
+        self._tpm_limit = getattr(self.provider_config, 'rate_limit_tpm', 0)
+        self._token_allowance = float(self._tpm_limit)
+        self._token_refill_time = time.time()
 
         logger.info(f"BatchProvider初始化: {self.provider_name} ({self.model})")
 
     @property
     def client(self) -> AsyncOpenAI:
-        """获取主提供商客户端"""
+        """获取主提供商客户端（延迟创建）"""
+        if self._client is None:
+            self._client = AsyncOpenAI(
+                api_key=self.provider_config.api_key,
+                base_url=self.provider_config.base_url
+            )
         return self._client
 
     def _calculate_min_interval(self) -> float:
@@ -60,18 +79,39 @@ class BatchProvider:
         logger.info(f"速率限制: RPM={rpm}, 安全间隔={interval:.2f}秒")
         return interval
 
-    async def _apply_rate_limit(self):
-        """应用速率限制"""
-        import time
-        current_time = time.time()
-        elapsed = current_time - self._last_request_time
-        
-        if elapsed < self._min_request_interval:
-            wait_time = self._min_request_interval - elapsed
-            logger.debug(f"速率限制等待: {wait_time:.2f}秒")
-            await asyncio.sleep(wait_time)
+    async def _apply_rate_limit(self, estimated_tokens: int = 0):
+        """应用速率限制
+
+        并发批次在锁内依次等待，避免同时读取上次请求时间后一起发出请求。
+
+        Args:
+            estimated_tokens: 本次请求预估token数（仅配置rate_limit_tpm时使用）
+        """
+        async with self._rate_limit_lock:
+            current_time = time.time()
+            wait_time = self._last_request_time + self._min_request_interval - current_time
+            
+            if self._tpm_limit > 0 and estimated_tokens > 0:
+                wait_time = max(wait_time, self._reserve_tokens(estimated_tokens, current_time))
+            
+            if wait_time > 0:
+                logger.debug("速率限制等待: %.2f秒", wait_time)
+                await asyncio.sleep(wait_time)
+            
+            self._last_request_time = time.time()
+
+    def _reserve_tokens(self, tokens: int, current_time: float) -> float:
+        """从TPM令牌桶预留token，返回需要等待的秒数"""
+        refill_rate = self._tpm_limit / 60.0
+        self._token_allowance = min(
+            float(self._tpm_limit),
+            self._token_allowance + (current_time - self._token_refill_time) * refill_rate
+        )
+        self._token_refill_time = current_time
         
-        self._last_request_time = time.time()
+        # 单次请求超过上限时按上限计算，避免永远等待
+        self._token_allowance -= min(tokens, self._tpm_limit)
+        return -self._token_allowance / refill_rate if self._token_allowance < 0 else 0.0
 
     def _get_fallback_client(self, provider_name: str) -> AsyncOpenAI:
         """
@@ -95,7 +135,7 @@ class BatchProvider:
                 api_key=config.api_key,
                 base_url=config.base_url
             )
-            logger.debug(f"创建 fallback 客户端: {provider_name}")
+            logger.debug("创建 fallback 客户端: %s", provider_name)
         
         return self._fallback_clients[provider_name]
 
@@ -103,7 +143,6 @@ class BatchProvider:
     def prompt_engine(self):
         """延迟加载 PromptEngine 实例"""
         if self._prompt_engine is None:
-            from .prompt_engine import PromptEngine
             self._prompt_engine = PromptEngine(self.config)
         return self._prompt_engine
 
@@ -135,8 +174,8 @@ class BatchProvider:
             asyncio.TimeoutError: 请求超时
             Exception: API调用失败
         """
-        # 应用速率限制
-        await self._apply_rate_limit()
+        # 应用速率限制（token预估：中英混合文本按约2字符/token，加上最大输出token）
+        await self._apply_rate_limit(len(prompt) // 2 + max_tokens)
         
         messages = [
             {"role": "system", "content": self.SYSTEM_PROMPT},
@@ -216,12 +255,15 @@ class BatchProvider:
             asyncio.TimeoutError: 请求超时
             Exception: API调用失败
         """
-        max_tokens = max_tokens or self.provider_config.max_tokens
-        temperature = temperature or self.provider_config.temperature
-        timeout = timeout or self.config.timeout_seconds
+        if max_tokens is None:
+            max_tokens = self._default_max_tokens
+        if temperature is None:
+            temperature = self._default_temperature
+        if timeout is None:
+            timeout = self._default_timeout
 
         try:
-            logger.debug(f"调用API: {self.provider_name}, timeout={timeout}s")
+            logger.debug("调用API: %s, timeout=%ss", self.provider_name, timeout)
             self.api_call_count += 1
 
             return await self._make_request(
@@ -260,13 +302,22 @@ class BatchProvider:
         except Exception as e:
             logger.warning(f"主提供商 {self.provider_name} 失败: {e}")
 
+        return await self._call_fallback_chain(prompt, max_tokens, temperature)
+
+    async def _call_fallback_chain(
+        self,
+        prompt: str,
+        max_tokens: int | None = None,
+        temperature: float | None = None
+    ) -> str:
+        """依次调用fallback链中的提供商（不再请求主提供商）
+
+        主提供商已对同一prompt触发内容过滤时直接使用，避免重复一次必然失败的往返。
+        """
         if not self.config.fallback_enabled:
             raise Exception("回退未启用，主提供商失败")
 
-        for fallback_name in self.config.fallback_chain:
-            if fallback_name not in self.config.providers_config:
-                continue
-
+        for fallback_name in self._fallback_names:
             try:
                 logger.info(f"尝试回退提供商: {fallback_name}")
                 return await self._call_provider(
@@ -291,40 +342,62 @@ class BatchProvider:
         Returns:
             int: 计算后的子批次大小
         """
-        sub_batch_size = None
+        if self._base_sub_batch_size is None:
+            self._base_sub_batch_size = self._resolve_base_sub_batch_size()
         
+        # 确保不超过原批次大小，且至少为1
+        return max(1, min(self._base_sub_batch_size, original_size))
+
+    def _resolve_base_sub_batch_size(self) -> int:
+        """解析子批次基准大小（策略1与保底策略，只依赖配置）"""
         # 策略1: 使用fallback链中第一个可用提供商的batch_size
-        if self.config.fallback_enabled and self.config.fallback_chain:
-            for fallback_name in self.config.fallback_chain:
-                if fallback_name in self.config.providers_config:
-                    fallback_config = self.config.providers_config[fallback_name]
-                    sub_batch_size = getattr(fallback_config, 'batch_size', None)
-                    if sub_batch_size:
-                        logger.debug(f"使用fallback提供商 '{fallback_name}' 的batch_size: {sub_batch_size}")
-                        break
+        if self.config.fallback_enabled:
+            for fallback_name in self._fallback_names:
+                fallback_config = self.config.providers_config[fallback_name]
+                sub_batch_size = getattr(fallback_config, 'batch_size', None)
+                if sub_batch_size:
+                    logger.debug("使用fallback提供商 '%s' 的batch_size: %s", fallback_name, sub_batch_size)
+                    return sub_batch_size
         
         # 策略A(保底): 使用主提供商的batch_size
-        if sub_batch_size is None:
-            sub_batch_size = getattr(self.provider_config, 'batch_size', 5)
-            logger.debug(f"fallback链不可用，使用主提供商batch_size: {sub_batch_size}")
-        
-        # 确保不超过原批次大小，且至少为1
-        sub_batch_size = min(sub_batch_size, original_size)
-        sub_batch_size = max(1, sub_batch_size)
-        
+        sub_batch_size = getattr(self.provider_config, 'batch_size', 5)
+        logger.debug("fallback链不可用，使用主提供商batch_size: %s", sub_batch_size)
         return sub_batch_size
 
     def _create_default_result_dict(self, index: int, reason: str = "") -> dict:
         """创建默认结果字典（使用DefaultScores常量）"""
         return DefaultScores.to_dict(index, reason)
 
+    @staticmethod
+    def _parse_sub_batch_results(response: str, start: int) -> list[dict]:
+        """解析子批次响应，并将news_index调整为原批次中的全局索引
+
+        Args:
+            response: 子批次API响应JSON字符串
+            start: 子批次在原批次中的起始偏移
+
+        Raises:
+            ValueError: 响应格式无法识别
+        """
+        results = json_loads(response)
+        if not isinstance(results, list):
+            if isinstance(results, dict) and 'results' in results:
+                results = results['results']
+            else:
+                raise ValueError(f"Unexpected response format: {type(results)}")
+
+        for news_index, result in enumerate(results, start + 1):
+            if 'news_index' in result:
+                result['news_index'] = news_index
+        return results
+
     async def _retry_with_smaller_batches(
         self,
         items: list[NewsItem],
         prompt_template: str,
         max_tokens: int | None = None,
         temperature: float | None = None
-    ) -> str:
+    ) -> dict:
         """
         将批次拆分为更小的子批次重试
 
@@ -338,7 +411,7 @@ class BatchProvider:
             temperature: 温度参数
 
         Returns:
-            str: 合并后的JSON结果字符串
+            dict: 合并后的结果字典（{"results": [...]}，已解析，无需再反序列化）
 
         Raises:
             ContentFilterError: 子批次仍然触发内容过滤
@@ -349,17 +422,17 @@ class BatchProvider:
         sub_batch_size = self._get_sub_batch_size(original_size)
 
         logger.info(
-            f"批次细分重试: 原批次{original_size}条 → 子批次{sub_batch_size}条"
+            f"批次细分重试: 原批次{original_size}条 → 子批次{sub_batch_size}条 (并行提交)"
         )
 
-        all_results = []
+        total_sub_batches = (original_size + sub_batch_size - 1) // sub_batch_size
 
-        # 分批重试
-        for i in range(0, original_size, sub_batch_size):
-            sub_items = items[i:i + sub_batch_size]
-            sub_batch_id = f"{i//sub_batch_size + 1}/{(original_size + sub_batch_size - 1)//sub_batch_size}"
+        async def process_sub_batch(sub_index: int, start: int) -> list[dict]:
+            """处理单个子批次，返回调整为全局索引的结果列表"""
+            sub_items = items[start:start + sub_batch_size]
+            sub_batch_id = f"{sub_index}/{total_sub_batches}"
 
-            logger.debug(f"处理子批次 {sub_batch_id}: {len(sub_items)}条")
+            logger.debug("处理子批次 %s: %d条", sub_batch_id, len(sub_items))
 
             try:
                 # 构建子批次prompt
@@ -370,70 +443,70 @@ class BatchProvider:
                     sub_prompt, max_tokens, temperature
                 )
 
-                # 解析子批次结果
-                sub_results = json.loads(sub_response)
-                if not isinstance(sub_results, list):
-                    if isinstance(sub_results, dict) and 'results' in sub_results:
-                        sub_results = sub_results['results']
-                    else:
-                        raise ValueError(f"Unexpected response format: {type(sub_results)}")
+                # 解析子批次结果（news_index调整为全局索引）
+                sub_results = self._parse_sub_batch_results(sub_response, start)
 
-                # 调整news_index为全局索引
-                for j, result in enumerate(sub_results):
-                    if 'news_index' in result:
-                        result['news_index'] = i + j + 1
-
-                all_results.extend(sub_results)
-                logger.debug(f"子批次 {sub_batch_id} 成功: {len(sub_results)}条结果")
+                logger.debug("子批次 %s 成功: %d条结果", sub_batch_id, len(sub_results))
+                return sub_results
 
             except ContentFilterError:
                 # 子批次触发内容过滤，使用fallback提供商处理
                 logger.warning(f"子批次 {sub_batch_id} (大小={len(sub_items)}) 触发内容过滤，尝试fallback提供商")
                 try:
                     # 使用带fallback的API调用处理该子批次
-                    fallback_response = await self.call_with_fallback(sub_prompt, max_tokens, temperature)
-                    
-                    # 解析fallback结果
-                    fallback_results = json.loads(fallback_response)
-                    if not isinstance(fallback_results, list):
-                        if isinstance(fallback_results, dict) and 'results' in fallback_results:
-                            fallback_results = fallback_results['results']
-                        else:
-                            raise ValueError(f"Unexpected response format: {type(fallback_results)}")
+                    fallback_response = await self._call_fallback_chain(sub_prompt, max_tokens, temperature)
                     
-                    # 调整news_index为全局索引
-                    for j, result in enumerate(fallback_results):
-                        if 'news_index' in result:
-                            result['news_index'] = i + j + 1
+                    # 解析fallback结果（news_index调整为全局索引）
+                    fallback_results = self._parse_sub_batch_results(fallback_response, start)
                     
-                    all_results.extend(fallback_results)
                     logger.info(f"子批次 {sub_batch_id} fallback处理成功: {len(fallback_results)}条")
+                    return fallback_results
                     
                 except Exception as fallback_error:
                     logger.error(f"子批次 {sub_batch_id} fallback处理失败: {fallback_error}")
                     # 所有fallback都失败，添加默认结果
-                    for j in range(len(sub_items)):
-                        all_results.append(self._create_default_result_dict(
-                            i + j + 1, f"fallback失败: {str(fallback_error)[:30]}"
-                        ))
-                continue
+                    return [
+                        self._create_default_result_dict(
+                            news_index, f"fallback失败: {str(fallback_error)[:30]}"
+                        )
+                        for news_index in range(start + 1, start + len(sub_items) + 1)
+                    ]
             except Exception as e:
                 # 其他错误，记录并继续
                 logger.error(f"子批次 {sub_batch_id} 处理失败: {e}")
                 # 为子批次添加默认结果
-                for j in range(len(sub_items)):
-                    all_results.append(self._create_default_result_dict(
-                        i + j + 1, f"处理失败: {str(e)[:30]}"
-                    ))
-                continue
+                return [
+                    self._create_default_result_dict(
+                        news_index, f"处理失败: {str(e)[:30]}"
+                    )
+                    for news_index in range(start + 1, start + len(sub_items) + 1)
+                ]
+
+        # 并行提交子批次（信号量限制并发，速率限制仍由_make_request统一控制）
+        max_concurrent = max(1, getattr(self.provider_config, 'max_concurrent', 3))
+        semaphore = asyncio.Semaphore(max_concurrent)
+
+        async def process_with_semaphore(sub_index: int, start: int) -> list[dict]:
+            async with semaphore:
+                return await process_sub_batch(sub_index, start)
+
+        sub_batch_results = await asyncio.gather(*[
+            process_with_semaphore(sub_index, start)
+            for sub_index, start in enumerate(range(0, original_size, sub_batch_size), 1)
+        ])
+
+        # 按提交顺序合并结果
+        all_results = []
+        for sub_results in sub_batch_results:
+            all_results.extend(sub_results)
 
         if not all_results:
             raise ContentFilterError("所有子批次均触发内容过滤", provider=self.provider_name)
 
         logger.info(f"批次细分重试完成: {len(all_results)}/{original_size}条成功")
 
-        # 返回JSON字符串格式
-        return json.dumps({"results": all_results})
+        # 子批次结果已逐个解析，直接返回结果字典，避免序列化后再由ResultProcessor重新解析
+        return {"results": all_results}
 
     def _create_default_results_response(
         self,
@@ -456,14 +529,14 @@ class BatchProvider:
         prompt_template: str | None = None,
         max_tokens: int | None = None,
         temperature: float | None = None
-    ) -> str:
+    ) -> str | dict:
         """
         调用批量API，支持fallback处理
         
         简化流程:
         1. 尝试主提供商批量调用
         2. 失败 ContentFilterError → 拆小批次重试
-        3. 子批次失败 → 使用call_with_fallback批量调用fallback链
+        3. 子批次失败 → 使用_call_fallback_chain批量调用fallback链
         4. 所有fallback失败 → 返回默认分数
         
         Args:
@@ -474,11 +547,11 @@ class BatchProvider:
             temperature: 温度参数
             
         Returns:
-            str: API响应或fallback结果的JSON字符串
+            str | dict: API响应或fallback结果的JSON字符串；批次细分重试时为已解析的结果字典
         """
         try:
             # 1. 首先尝试正常批次调用
-            logger.debug(f"尝试主提供商批次调用: {self.provider_name}")
+            logger.debug("尝试主提供商批次调用: %s", self.provider_name)
             return await self.call_batch_api(prompt, max_tokens, temperature)
             
         except ContentFilterError as e:
@@ -502,7 +575,7 @@ class BatchProvider:
             # 3. 尝试fallback链（批量调用）
             try:
                 logger.info("尝试fallback提供商批量调用")
-                return await self.call_with_fallback(prompt, max_tokens, temperature)
+                return await self._call_fallback_chain(prompt, max_tokens, temperature)
             except Exception as fallback_error:
                 logger.error(f"所有fallback提供商均失败: {fallback_error}")
                 # 4. 返回默认分数
@@ -520,7 +593,7 @@ class BatchProvider:
                 )
                 
                 try:
-                    return await self.call_with_fallback(prompt, max_tokens, temperature)
+                    return await self._call_fallback_chain(prompt, max_tokens, temperature)
                 except Exception as fallback_error:
                     logger.error(f"Fallback失败: {fallback_error}")
                     return self._create_default_results_response(
@@ -531,51 +604,6 @@ class BatchProvider:
                 # 非内容过滤错误，重新抛出
                 raise
 
-    def _extract_scoring_criteria(self, prompt: str) -> str:
-        """
-        从完整prompt中提取评分标准说明
-        
-        Args:
-            prompt: 完整prompt字符串
-            
-        Returns:
-            str: 评分标准说明部分
-        """
-        # 提取任务要求和评分维度说明
-        import re
-        
-        # 查找评分相关的段落
-        scoring_sections = []
-        
-        # 匹配5维度评分说明
-        dimensions_pattern = r"([\d一二三四五]\s*\*\*[^*]+\*\*[^\n]+)"
-        dimensions = re.findall(dimensions_pattern, prompt)
-        if dimensions:
-            scoring_sections.extend(dimensions)
-        
-        # 匹配权重说明
-        weight_pattern = r"（权重[^）]+）"
-        weights = re.findall(weight_pattern, prompt)
-        
-        # 构建评分标准说明
-        if scoring_sections:
-            return (
-                "请按以下5维度评分（1-10分）：\n" +
-                "\n".join(f"  {s}" for s in scoring_sections[:5]) +
-                "\n\n计算加权总分并给出中文总结。"
-            )
-        
-        # 默认评分说明
-        return (
-            "请按以下5维度评分（1-10分）：\n"
-            "  1. 重要性（权重30%）\n"
-            "  2. 时效性（权重20%）\n"
-            "  3. 技术深度（权重20%）\n"
-            "  4. 受众广度（权重15%）\n"
-            "  5. 实用性（权重15%）\n"
-            "\n计算加权总分并给出中文总结。"
-        )
-
     async def _call_provider(
         self,
         provider_name: str,
@@ -607,13 +635,18 @@ class BatchProvider:
 
         logger.info(f"使用提供商 {provider_name} (模型: {config.model})")
 
+        if max_tokens is None:
+            max_tokens = config.max_tokens
+        if temperature is None:
+            temperature = config.temperature
+
         return await self._make_request(
             client=client,
             model=config.model,
             prompt=prompt,
-            max_tokens=max_tokens or config.max_tokens,
-            temperature=temperature or config.temperature,
-            timeout=self.config.timeout_seconds
+            max_tokens=max_tokens,
+            temperature=temperature,
+            timeout=self._default_timeout
         )
     
     def get_stats(self) -> dict[str, Any]:
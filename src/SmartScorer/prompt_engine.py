@@ -1,5 +1,6 @@
 """PromptEngine - 1-Pass Prompt生成引擎"""
 
+import hashlib
 import logging
 from src.models import NewsItem, AIConfig
 
@@ -9,19 +10,44 @@ logger = logging.getLogger(__name__)
 class PromptEngine:
     """1-Pass Prompt生成引擎"""
 
+    # 随批次变化部分的模板（静态任务说明见 _build_instructions）
+    _PROMPT_TEMPLATE = "请对以下 {count} 条新闻进行专业评估。\n\n{news_blocks}{instructions}"
+    _NEWS_ITEM_TEMPLATE = "【新闻 {index}】\n标题: {title}\n来源: {source}\n内容: {context}{length_hint}"
+
     def __init__(self, config: AIConfig):
         self.config = config
         self.scoring_criteria = config.scoring_criteria
+        self._instructions = self._build_instructions()
+        self.prompt_version = self._compute_prompt_version()
         logger.info("PromptEngine初始化完成")
     
-    def build_1pass_prompt(self, items: list[NewsItem]) -> str:
-        """构建1-pass评分Prompt"""
-        news_blocks = [self._format_news_item(item, i) for i, item in enumerate(items, 1)]
+    def _compute_prompt_version(self) -> str:
+        """Prompt版本标识：模板文本、任务说明与评分权重的哈希
+
+        Prompt或权重任何改动都会得到新的版本标识，使历史评分缓存自动失效，无需手动维护版本号
+        """
         sc = self.scoring_criteria
+        raw = "\0".join((
+            self._PROMPT_TEMPLATE,
+            self._NEWS_ITEM_TEMPLATE,
+            self._instructions,
+            f"{sc.importance}:{sc.timeliness}:{sc.technical_depth}:"
+            f"{sc.audience_breadth}:{sc.practicality}",
+        ))
+        return hashlib.md5(raw.encode()).hexdigest()[:12]
 
-        return f"""请对以下 {len(items)} 条新闻进行专业评估。
+    def build_1pass_prompt(self, items: list[NewsItem]) -> str:
+        """构建1-pass评分Prompt（仅新闻列表部分随批次变化）"""
+        news_blocks = "\n".join(self._format_news_item(item, i) for i, item in enumerate(items, 1))
+        return self._PROMPT_TEMPLATE.format(
+            count=len(items), news_blocks=news_blocks, instructions=self._instructions
+        )
+    
+    def _build_instructions(self) -> str:
+        """构建Prompt中的静态任务说明（评分权重来自配置，初始化时生成一次）"""
+        sc = self.scoring_criteria
 
-{chr(10).join(news_blocks)}
+        return f"""
 
 【任务要求】
 对每条新闻完成以下3项评估：
@@ -155,4 +181,7 @@ class PromptEngine:
         context_length = len(context)
         length_hint = f" (长度: {context_length}字)" if context_length > 500 else ""
 
-        return f"【新闻 {index}】\n标题: {item.title}\n来源: {item.source}\n内容: {context}{length_hint}"
+        return self._NEWS_ITEM_TEMPLATE.format(
+            index=index, title=item.title, source=item.source,
+            context=context, length_hint=length_hint
+        )
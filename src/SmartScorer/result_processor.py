@@ -2,16 +2,29 @@
 
 import json
 import logging
+from src.constants import DefaultScores
 from src.models import NewsItem, AIConfig
 
+# JSON解析函数（公开供BatchProvider解析子批次响应复用）
+try:
+    # 可选依赖：orjson解析速度更快，未安装时回退到标准库
+    # orjson.JSONDecodeError 继承自 json.JSONDecodeError，异常处理无需区分
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
 
 logger = logging.getLogger(__name__)
 
+# 用于从截断响应中逐个解析完整结果对象
+_JSON_DECODER = json.JSONDecoder()
+
 
 class ResultProcessor:
     """1-Pass结果解析器"""
 
-    VALID_CATEGORIES = {'财经', '科技', '社会政治'}
+    VALID_CATEGORIES = frozenset({'财经', '科技', '社会政治'})
 
     def __init__(self, config: AIConfig = None):
         """
@@ -21,6 +34,10 @@ class ResultProcessor:
             config: AI配置对象，用于获取默认分数等配置值
         """
         self.config = config
+        # 缺失维度分数时的默认值（由配置决定，初始化时解析一次，逐条应用结果时直接复用）
+        self._dim_default = config.default_dimension_score if config else 5
+        # 应用了默认/失败结果的新闻（按对象id记录），此类结果不写入评分缓存
+        self._default_item_ids: set[int] = set()
         self._stats = {
             'total_parsed': 0,
             'parse_errors': 0,
@@ -35,13 +52,28 @@ class ResultProcessor:
             return self.config.default_score_on_parse_error
         return 5.0  # 回退默认值
     
+    def mark_default(self, items: list[NewsItem]) -> None:
+        """记录应用了默认/失败结果的新闻"""
+        self._default_item_ids.update(map(id, items))
+
+    def is_default(self, item: NewsItem) -> bool:
+        """新闻的评分是否为默认/失败结果"""
+        return id(item) in self._default_item_ids
+
+    def clear_default_marks(self) -> None:
+        """清空默认结果记录（每轮评分开始时调用）"""
+        self._default_item_ids.clear()
+
     def _apply_default_score(self, item: NewsItem, reason: str = "unknown") -> None:
         """统一应用默认分数和分类"""
+        self._default_item_ids.add(id(item))
         item.ai_score = self.default_score
         item.ai_category = '社会政治'
         item.ai_category_confidence = 0.5
         item.ai_summary = f"[系统默认值 - {reason}]"
-        logger.debug(f"为新闻 '{item.title[:30]}...' 应用默认分数 (原因: {reason})")
+        # 整批失败时逐条调用，未开启DEBUG时跳过标题截取与格式化
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"为新闻 '{item.title[:30]}...' 应用默认分数 (原因: {reason})")
 
     def _apply_default_to_batch(self, items: list[NewsItem], reason: str = "parse_error") -> None:
         """为一批新闻应用默认值"""
@@ -80,14 +112,15 @@ class ResultProcessor:
         else:
             raise ValueError(f"Unexpected response type: {type(data)}")
 
-    def parse_1pass_response(self, items: list[NewsItem], response: str) -> list[NewsItem]:
+    def parse_1pass_response(self, items: list[NewsItem], response: str | dict) -> list[NewsItem]:
         """
         解析1-pass API响应
         
-        使用 _normalize_response 统一处理各种响应格式
+        使用 _normalize_response 统一处理各种响应格式；
+        response 为已解析的结果字典（批次细分重试合并结果）时直接使用
         """
         try:
-            data = json.loads(response)
+            data = response if isinstance(response, dict) else json_loads(response)
             
             # 统一处理响应格式
             try:
@@ -97,24 +130,22 @@ class ResultProcessor:
                 self._apply_default_to_batch(items, f"invalid_response_format: {e}")
                 return items
 
-            result_map = {r['news_index']: r for r in results if 'news_index' in r}
-
-            scored_items = []
-            for i, item in enumerate(items, 1):
-                if i in result_map:
-                    scored_items.append(self._apply_result(item, result_map[i]))
-                else:
-                    logger.warning(f"新闻{i}未找到评分结果，使用默认值")
-                    self._apply_default_score(item, "missing_index")
-                    scored_items.append(item)
-
+            self._apply_results(items, results)
             self._stats['total_parsed'] += len(items)
-            return scored_items
+            return items
 
         except json.JSONDecodeError as e:
             logger.error(f"JSON解析失败: {e}")
             self._stats['parse_errors'] += 1
-            self._apply_default_to_batch(items, "json_decode_error")
+
+            # 响应被截断时（如达到max_tokens），恢复已完整返回的结果
+            results = self._salvage_partial_results(response)
+            if results:
+                logger.warning(f"响应JSON不完整，已恢复 {len(results)}/{len(items)} 条完整结果")
+                self._apply_results(items, results)
+                self._stats['total_parsed'] += len(items)
+            else:
+                self._apply_default_to_batch(items, "json_decode_error")
             return items
         except Exception as e:
             logger.error(f"解析失败: {e}")
@@ -122,6 +153,42 @@ class ResultProcessor:
             self._apply_default_to_batch(items, f"parse_error: {e}")
             return items
     
+    def _apply_results(self, items: list[NewsItem], results: list[dict]) -> None:
+        """按news_index将结果对齐写入新闻项，缺失的使用默认值"""
+        result_map = {r['news_index']: r for r in results if 'news_index' in r}
+
+        # 单次查找完成对齐，结果原地写入新闻项
+        for i, item in enumerate(items, 1):
+            result = result_map.get(i)
+            if result is not None:
+                self._apply_result(item, result)
+            else:
+                logger.warning(f"新闻{i}未找到评分结果，使用默认值")
+                self._apply_default_score(item, "missing_index")
+
+    def _salvage_partial_results(self, response: str) -> list[dict]:
+        """从截断的JSON响应中增量解析结果数组里已完整的对象"""
+        pos = response.find('[')
+        if pos == -1:
+            return []
+
+        results = []
+        pos += 1
+        length = len(response)
+        while pos < length:
+            # 跳过空白和分隔逗号
+            while pos < length and response[pos] in ' \t\r\n,':
+                pos += 1
+            if pos >= length or response[pos] != '{':
+                break
+            try:
+                obj, pos = _JSON_DECODER.raw_decode(response, pos)
+            except json.JSONDecodeError:
+                break  # 到达截断位置
+            if isinstance(obj, dict):
+                results.append(obj)
+        return results
+
     def _apply_result(self, item: NewsItem, result: dict) -> NewsItem:
         """将解析结果应用到新闻项"""
         # 中文标题生成（新增）
@@ -138,7 +205,7 @@ class ResultProcessor:
         item.ai_category_confidence = result.get('category_confidence', 0.5)
 
         # 分数 - 使用配置中的默认值
-        dim_default = self.config.default_dimension_score if self.config else 5
+        dim_default = self._dim_default
         total_score = result.get('total_score')
         if total_score is None:
             total_score = (
@@ -153,13 +220,14 @@ class ResultProcessor:
         # 总结
         item.ai_summary = result.get('summary', '')
 
+        # 批量调用失败时由BatchProvider生成的默认结果，同样记为默认结果
+        if result.get(DefaultScores.MARKER):
+            self._default_item_ids.add(id(item))
+        else:
+            self._default_item_ids.discard(id(item))
+
         return item
     
-    def _apply_defaults(self, items: list[NewsItem]) -> list[NewsItem]:
-        """应用默认分数"""
-        self._apply_default_to_batch(items, "apply_defaults")
-        return items
-
     def get_stats(self) -> dict:
         return self._stats.copy()
 
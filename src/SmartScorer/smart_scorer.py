@@ -1,12 +1,14 @@
 """SmartScorer - 1-Pass AI 新闻评分核心协调器"""
 
 import asyncio
+import hashlib
 import logging
 from datetime import datetime
-from collections import defaultdict
+from collections import Counter
 
-from src.models import NewsItem, AIConfig
+from src.models import NewsItem, AIConfig, ScoreResult
 from src.exceptions import ContentFilterError
+from src.history_manager import HistoryManager
 from .batch_provider import BatchProvider
 from .prompt_engine import PromptEngine
 from .result_processor import ResultProcessor
@@ -17,8 +19,15 @@ logger = logging.getLogger(__name__)
 class SmartScorer:
     """智能评分器 - 1-pass完成分类+评分+筛选"""
     
-    def __init__(self, config: AIConfig):
+    __slots__ = (
+        'config', 'history', 'batch_provider', 'prompt_engine', 'result_processor',
+        '_max_retries', '_retry_delay', '_speculative_delay', '_stats'
+    )
+
+    def __init__(self, config: AIConfig, history: HistoryManager | None = None):
         self.config = config
+        # 评分缓存（复用历史数据文件），未传入或配置关闭时不启用
+        self.history = history if getattr(config, 'score_cache_enabled', True) else None
         self.batch_provider = BatchProvider(config)
         self.prompt_engine = PromptEngine(config)
         self.result_processor = ResultProcessor(config)
@@ -26,12 +35,19 @@ class SmartScorer:
         # 重试配置
         self._max_retries = getattr(config, 'max_retries', 2)
         self._retry_delay = getattr(config, 'retry_delay', 1.0)
+        # 推测重试：未启用时为None
+        self._speculative_delay = (
+            getattr(config, 'speculative_retry_delay', 30.0)
+            if getattr(config, 'speculative_retry', False) else None
+        )
         
         self._stats = {
             'total_processed': 0,
             'total_api_calls': 0,
             'avg_processing_time': 0.0,
-            'success_rate': 1.0
+            'success_rate': 1.0,
+            'cache_hits': 0,
+            'cache_misses': 0
         }
         logger.info(f"SmartScorer初始化完成 (batch_size={config.batch_size}, max_retries={self._max_retries})")
     
@@ -43,9 +59,21 @@ class SmartScorer:
         start_time = datetime.now()
         logger.info(f"SmartScorer开始处理 {len(items)} 条新闻")
         
-        batches = self._create_batches(items)
+        self.result_processor.clear_default_marks()
+        # 每条新闻只计算一次缓存键，供缓存查询、本轮去重和缓存写入共用
+        keyed_items = [(self._cache_key(item), item) for item in items]
+        cached_items, keyed_to_score = self._split_cached(keyed_items)
+        unique_keyed, duplicates = self._split_duplicates(keyed_to_score)
+        batches = self._create_batches([item for _, item in unique_keyed])
         scored_items = await self._process_batches(batches)
-        final_items = self._select_top_items(scored_items)
+        self._cache_results(unique_keyed)
+
+        # 重复新闻复用首条的评分结果
+        for duplicate, original in duplicates:
+            ScoreResult.from_item(original).apply_to(duplicate)
+        duplicate_items = [duplicate for duplicate, _ in duplicates]
+
+        final_items = self._select_top_items(cached_items + scored_items + duplicate_items)
         
         duration = (datetime.now() - start_time).total_seconds()
         self._update_stats(len(items), len(final_items), duration)
@@ -53,12 +81,86 @@ class SmartScorer:
         logger.info(f"SmartScorer完成: {len(items)} → {len(final_items)} 条 ({duration:.1f}s)")
         return final_items
     
+    def _cache_key(self, item: NewsItem) -> str:
+        """评分缓存键：标题+来源+摘要前200字+Prompt版本+提供商+模型"""
+        raw = (
+            f"{item.title}|{item.source}|{item.summary[:200]}|"
+            f"{self.prompt_engine.prompt_version}|{self.config.provider}|{self.batch_provider.model}"
+        )
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def _split_cached(
+        self,
+        keyed_items: list[tuple[str, NewsItem]]
+    ) -> tuple[list[NewsItem], list[tuple[str, NewsItem]]]:
+        """拆分为命中缓存（直接回填评分）和需要调用AI评分的新闻
+
+        Args:
+            keyed_items: [(缓存键, 新闻)]
+
+        Returns:
+            (命中缓存的新闻, [(缓存键, 需要评分的新闻)])
+        """
+        if self.history is None:
+            return [], keyed_items
+
+        cached_items = []
+        items_to_score = []
+        for key, item in keyed_items:
+            cached = self.history.get_cached_score(key)
+            if cached is None:
+                items_to_score.append((key, item))
+                continue
+            ScoreResult.from_dict(cached).apply_to(item)
+            cached_items.append(item)
+
+        self._stats['cache_hits'] += len(cached_items)
+        self._stats['cache_misses'] += len(items_to_score)
+        if cached_items:
+            logger.info(f"💾 评分缓存命中 {len(cached_items)} 条，需AI评分 {len(items_to_score)} 条")
+        return cached_items, items_to_score
+
+    def _cache_results(self, keyed_items: list[tuple[str, NewsItem]]) -> None:
+        """写入评分缓存（跳过默认/失败结果，下次运行重新评分）"""
+        if self.history is None:
+            return
+
+        for key, item in keyed_items:
+            if item.ai_score is None or self.result_processor.is_default(item):
+                continue
+            self.history.cache_score(key, ScoreResult.from_item(item).to_dict())
+
+    def _split_duplicates(
+        self,
+        keyed_items: list[tuple[str, NewsItem]]
+    ) -> tuple[list[tuple[str, NewsItem]], list[tuple[NewsItem, NewsItem]]]:
+        """本次运行内内容相同的新闻只评分一次
+
+        Returns:
+            ([(缓存键, 需要评分的新闻)], [(重复新闻, 提供评分的首条新闻)])
+        """
+        first_by_key: dict[str, NewsItem] = {}
+        unique_items = []
+        duplicates = []
+        for key, item in keyed_items:
+            original = first_by_key.setdefault(key, item)
+            if original is item:
+                unique_items.append((key, item))
+            else:
+                duplicates.append((item, original))
+
+        if duplicates:
+            logger.info(f"♻️ 本次运行内重复新闻 {len(duplicates)} 条，复用首条评分结果")
+        return unique_items, duplicates
+
     def _create_batches(self, items: list[NewsItem]) -> list[list[NewsItem]]:
-        """将新闻分批处理"""
-        return [
-            items[i:i + self.config.batch_size]
-            for i in range(0, len(items), self.config.batch_size)
-        ]
+        """将新闻分批处理
+
+        传入的是所有RSS源合并、去除缓存命中与重复后的新闻，各源共享批次，
+        API调用次数为 ceil(总条数/batch_size)，不会按源产生零散小批次。
+        """
+        batch_size = self.config.batch_size
+        return [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
 
     async def _process_single_batch(
         self,
@@ -78,14 +180,7 @@ class SmartScorer:
             logger.info(f"处理批次 {batch_id}: {len(batch)} 条新闻")
             prompt = self.prompt_engine.build_1pass_prompt(batch)
 
-            # 使用支持fallback的新API
-            response = await self.batch_provider.call_batch_api_with_fallback(
-                prompt=prompt,
-                items=batch,
-                prompt_template=None,  # 会从prompt自动提取
-                max_tokens=None,  # 使用配置默认值
-                temperature=None
-            )
+            response = await self._request_batch(prompt, batch, batch_id)
 
             scored_batch = self.result_processor.parse_1pass_response(batch, response)
             logger.info(f"批次 {batch_id} 处理完成: {len(scored_batch)} 条")
@@ -94,6 +189,7 @@ class SmartScorer:
         except ContentFilterError as e:
             logger.error(f"批次 {batch_id} 内容过滤且Gemini fallback失败: {e}")
             # 为整个批次赋予默认低分
+            self.result_processor.mark_default(batch)
             for item in batch:
                 item.ai_score = self.config.default_score_on_error
                 item.ai_category = "社会政治"
@@ -105,6 +201,44 @@ class SmartScorer:
             # 为整个批次赋予默认低分
             return self._apply_default_scores(batch, str(e))
 
+    async def _request_batch(self, prompt: str, batch: list[NewsItem], batch_id: str) -> str | dict:
+        """调用批量API（支持推测重试）
+
+        启用推测重试时，主请求超过等待时间仍未返回则并发发起相同的第二个请求，
+        先成功返回的结果胜出，另一个请求被取消；两个请求都失败时抛出主请求的异常。
+        """
+        def request():
+            # 使用支持fallback的新API
+            return self.batch_provider.call_batch_api_with_fallback(
+                prompt=prompt,
+                items=batch,
+                prompt_template=None,  # 会从prompt自动提取
+                max_tokens=None,  # 使用配置默认值
+                temperature=None
+            )
+
+        if self._speculative_delay is None:
+            return await request()
+
+        primary = asyncio.ensure_future(request())
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self._speculative_delay)
+            if done:
+                return primary.result()
+
+            logger.info(f"批次 {batch_id} 超过 {self._speculative_delay:.0f}秒未返回，发起推测重试请求")
+            pending.add(asyncio.ensure_future(request()))
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
     async def _process_single_batch_with_retry(
         self,
         batch: list[NewsItem],
@@ -152,6 +286,7 @@ class SmartScorer:
         default_score = getattr(self.config, 'default_score_on_error', 3.0)
         max_error_len = getattr(self.config, 'max_error_message_length', 50)
         
+        self.result_processor.mark_default(batch)
         for item in batch:
             item.ai_score = default_score
             item.ai_category = "社会政治"
@@ -162,26 +297,8 @@ class SmartScorer:
         logger.warning(f"已为批次应用默认分数 ({len(batch)} 条): {reason[:max_error_len]}")
         return batch
 
-    async def _process_batches(self, batches: list[list[NewsItem]]) -> list[NewsItem]:
-        """
-        并行批量处理（带重试）
-        
-        使用 asyncio.gather() 实现真正的并行处理，
-        使用信号量控制并发数避免API过载。
-        每个批次都有独立的重试机制。
-
-        Args:
-            batches: 新闻批次列表
-
-        Returns:
-            所有批次的评分结果
-        """
-        if not batches:
-            return []
-
-        total_batches = len(batches)
-
-        # ===== 优化后的并发数计算逻辑 =====
+    def _calculate_max_concurrent(self) -> int:
+        """根据提供商配置、全局配置和RPM计算批次并发数"""
         # 获取当前提供商配置
         current_provider = getattr(self.config, 'provider', 'zhipu')
         providers_config = getattr(self.config, 'providers_config', {})
@@ -212,20 +329,31 @@ class SmartScorer:
         logger.info(f"并发配置: 提供商={current_provider}, 全局={global_max_concurrent}, "
                     f"提供商限制={provider_max_concurrent}, RPM={rpm}, "
                     f"推荐={recommended_concurrent}, 最终={max_concurrent}")
-        # ===== 并发数计算结束 =====
+        return max_concurrent
 
-        # 如果只有1个批次或禁用并行，使用串行处理
-        if total_batches == 1 or max_concurrent == 1:
-            logger.info(f"串行处理 {total_batches} 个批次")
-            all_scored = []
-            for batch_idx, batch in enumerate(batches, 1):
-                batch_id = f"{batch_idx}/{total_batches}"
-                scored = await self._process_single_batch_with_retry(batch, batch_id)
-                all_scored.extend(scored)
-            logger.info(f"串行处理完成: 共 {len(all_scored)} 条")
-            return all_scored
+    async def _process_batches(self, batches: list[list[NewsItem]]) -> list[NewsItem]:
+        """
+        并行批量处理（带重试）
+        
+        使用 asyncio.gather() 实现真正的并行处理，
+        使用信号量控制并发数避免API过载。
+        每个批次都有独立的重试机制。
 
-        # 使用信号量控制并发
+        Args:
+            batches: 新闻批次列表
+
+        Returns:
+            所有批次的评分结果
+        """
+        if not batches:
+            return []
+
+        total_batches = len(batches)
+
+        # 单批次无需计算并发配置
+        max_concurrent = 1 if total_batches == 1 else self._calculate_max_concurrent()
+
+        # 串行（并发数为1）同样走信号量路径，信号量按提交顺序放行，批次依次执行
         semaphore = asyncio.Semaphore(max_concurrent)
 
         async def process_with_semaphore(batch_idx: int, batch: list[NewsItem]) -> list[NewsItem]:
@@ -234,23 +362,31 @@ class SmartScorer:
                 batch_id = f"{batch_idx}/{total_batches}"
                 return await self._process_single_batch_with_retry(batch, batch_id)
 
-        logger.info(f"🚀 并行处理 {total_batches} 个批次 (并发: {max_concurrent}, 每批次最大重试: {self._max_retries})")
+        if max_concurrent == 1:
+            logger.info(f"串行处理 {total_batches} 个批次")
+        else:
+            logger.info(f"🚀 并行处理 {total_batches} 个批次 (并发: {max_concurrent}, 每批次最大重试: {self._max_retries})")
 
-        # 并行执行所有批次
+        # 执行所有批次，gather按提交顺序返回结果
         tasks = [
             process_with_semaphore(batch_idx, batch)
             for batch_idx, batch in enumerate(batches, 1)
         ]
         
-        # 使用 return_exceptions=False，因为重试逻辑已处理异常
-        results = await asyncio.gather(*tasks)
+        # 重试逻辑已处理常规异常；兜底收集意外异常，避免单个批次中断其余批次的结果
+        results = await asyncio.gather(*tasks, return_exceptions=True)
 
-        # 合并结果
+        # 合并结果（意外失败的批次应用默认分数）
         all_scored = []
-        for result in results:
+        for batch, result in zip(batches, results):
+            if isinstance(result, BaseException):
+                if not isinstance(result, Exception):
+                    raise result
+                logger.error(f"批次处理出现未预期异常: {result}")
+                result = self._apply_default_scores(batch, str(result))
             all_scored.extend(result)
 
-        logger.info(f"✅ 并行处理完成: 共 {len(all_scored)} 条")
+        logger.info(f"✅ 批次处理完成: 共 {len(all_scored)} 条")
 
         return all_scored
 
@@ -267,14 +403,23 @@ class SmartScorer:
 
         max_items = self.config.max_output_items
 
-        # 按分类分组
-        by_category = defaultdict(list)
+        # 按分类分组（普通字典，读取路径不会插入空分类）
+        by_category: dict[str, list[NewsItem]] = {}
         for item in items:
-            category = getattr(item, 'ai_category', '未分类')
-            by_category[category].append(item)
+            by_category.setdefault(item.ai_category, []).append(item)
+
+        use_mixed = self.config.use_fixed_proportion and self.config.category_fixed_targets
+
+        # 候选数不超过上限，或只有一个分类时，配额分配的结果就是评分最高的前max_items条，
+        # 跳过分配直接截取（混合方案只从固定目标分类中选取，因此要求所有分类都在目标内）。
+        # 调用方传入的列表已按 (评分, 发布时间) 降序排列，前缀本身就是按评分稳定排序的结果，无需再排序
+        if (len(items) <= max_items or len(by_category) == 1) and (
+            not use_mixed or by_category.keys() <= self.config.category_fixed_targets.keys()
+        ):
+            return items[:max_items]
 
         # 根据配置选择算法
-        if self.config.use_fixed_proportion and self.config.category_fixed_targets:
+        if use_mixed:
             return self._ensure_diversity_mixed(items, by_category, max_items)
         else:
             return self._ensure_diversity_original(items, by_category, max_items)
@@ -292,7 +437,8 @@ class SmartScorer:
         guarantees = self.config.category_min_guarantee or {}
 
         selected = []
-        selected_by_category = defaultdict(int)
+        # 各阶段只涉及固定目标分类：预先建好全部键的普通字典，计数直接按键读写整数
+        selected_by_category = dict.fromkeys(fixed_targets, 0)
 
         # 第一阶段：固定保障（4:3:3）
         fixed_counts = {}
@@ -300,9 +446,9 @@ class SmartScorer:
             cat_items = by_category.get(category, [])
             actual_count = min(target, len(cat_items))
             fixed_counts[category] = actual_count
-            for item in cat_items[:actual_count]:
-                selected.append(item)
-                selected_by_category[category] += 1
+            if actual_count:
+                selected.extend(cat_items[:actual_count])
+                selected_by_category[category] += actual_count
 
         stage1_count = len(selected)
         logger.info(f"📊 混合方案-第一阶段(固定保障): {dict(fixed_counts)}, 共{stage1_count}条")
@@ -311,7 +457,7 @@ class SmartScorer:
         remaining_slots = max_items - stage1_count
 
         if remaining_slots > 0:
-            # 计算各分类剩余可用新闻数和比例
+            # 计算各分类剩余可用新闻（记录起始位置，分配时直接切片）
             remaining_by_category = {}
             total_remaining = 0
 
@@ -320,23 +466,19 @@ class SmartScorer:
                 already_selected = selected_by_category[category]
                 remaining = len(cat_items) - already_selected
                 if remaining > 0:
-                    remaining_by_category[category] = remaining
+                    remaining_by_category[category] = (cat_items, already_selected, remaining)
                     total_remaining += remaining
 
             if total_remaining > 0:
+                # 按剩余数量比例分配名额，并在同一遍中完成选取
                 proportion_counts = {}
-                for category, remaining_count in remaining_by_category.items():
+                stage2_selected = 0
+                for category, (cat_items, start, remaining_count) in remaining_by_category.items():
                     proportion = remaining_count / total_remaining
                     allocated = min(int(proportion * remaining_slots), remaining_count)
                     proportion_counts[category] = allocated
-
-                stage2_selected = 0
-                for category, allocated in proportion_counts.items():
-                    cat_items = by_category.get(category, [])
-                    already_selected = selected_by_category[category]
-                    for item in cat_items[already_selected:already_selected + allocated]:
-                        selected.append(item)
-                        selected_by_category[category] += 1
+                    selected.extend(cat_items[start:start + allocated])
+                    selected_by_category[category] += allocated
                     stage2_selected += allocated
 
                 logger.info(f"📊 混合方案-第二阶段(比例分配): {proportion_counts}, 实际分配{stage2_selected}条")
@@ -362,11 +504,8 @@ class SmartScorer:
         if stage3_count > 0:
             logger.info(f"📊 混合方案-第三阶段(轮询补充): {stage3_count}条")
 
-        # 记录最终分类分布
-        final_distribution = {}
-        for item in selected:
-            category = getattr(item, 'ai_category', '未分类')
-            final_distribution[category] = final_distribution.get(category, 0) + 1
+        # 记录最终分类分布（各阶段已累计selected_by_category，无需再遍历selected）
+        final_distribution = {category: count for category, count in selected_by_category.items() if count}
         logger.info(f"📊 最终分类分布(混合方案): {final_distribution}")
 
         # 最终按评分排序（共同排序逻辑）
@@ -399,17 +538,18 @@ class SmartScorer:
         else:
             adjusted_guarantees = guarantees
 
-        # 从各分类取保障数量
+        # 从各分类取保障数量（按剩余名额整段截取，无需逐条判断上限）
         selected = []
         for category, min_count in adjusted_guarantees.items():
             cat_items = by_category.get(category, [])
-            for item in cat_items[:min_count]:
-                if len(selected) < max_items:
-                    selected.append(item)
+            selected.extend(cat_items[:min_count][:max_items - len(selected)])
 
-        # 补充剩余名额（按评分从高到低）
+        # 补充剩余名额（按评分从高到低），用对象id集合判重，避免逐条扫描已选列表
+        selected_ids = {id(item) for item in selected}
         for item in items:
-            if item not in selected and len(selected) < max_items:
+            if len(selected) >= max_items:
+                break
+            if id(item) not in selected_ids:
                 selected.append(item)
 
         # 最终按评分排序
@@ -423,8 +563,7 @@ class SmartScorer:
     def _update_stats(self, input_count: int, output_count: int, duration: float):
         """更新统计信息"""
         self._stats['total_processed'] += input_count
-        provider_stats = self.batch_provider.get_stats()
-        self._stats['total_api_calls'] = provider_stats.get('api_call_count', 0)
+        self._stats['total_api_calls'] = self.batch_provider.api_call_count
 
         if self._stats['total_processed'] > 0:
             current_avg = self._stats['avg_processing_time']
@@ -470,12 +609,9 @@ class SmartScorer:
         selected = self._ensure_diversity(sorted_items)
         
         # 记录统计
-        category_counts = {}
-        for item in selected:
-            cat = getattr(item, 'ai_category', '未分类')
-            category_counts[cat] = category_counts.get(cat, 0) + 1
+        category_counts = Counter(item.ai_category for item in selected)
         
-        logger.info(f"📊 分类分布: {category_counts}")
+        logger.info(f"📊 分类分布: {dict(category_counts)}")
         logger.info(f"📋 从 {len(filtered)} 条中精选 Top {len(selected)} 条新闻")
         
         return selected
@@ -2,17 +2,40 @@
 配置管理模块
 负责加载和验证配置文件
 """
+import copy
 import os
 import yaml
+from functools import cached_property
 from pathlib import Path
 
 from typing import Any
 
 from src.models import RSSSource, AIConfig, OutputConfig, FilterConfig, ProviderConfig, ScoringCriteria
 
+# smart_ai 常用配置项及默认值（新增配置项只需在此添加一行）
+_COMMON_AI_DEFAULTS: dict[str, Any] = {
+    'batch_size': 10,
+    'max_concurrent': 3,
+    'timeout_seconds': 90,
+    'max_output_items': 30,
+    'diversity_weight': 0.3,
+    'fallback_enabled': True,
+    'fallback_chain': ['deepseek', 'gemini'],
+    'category_min_guarantee': {},
+    'category_fixed_targets': {},
+    'use_fixed_proportion': False,
+    'score_cache_enabled': True,
+    'score_cache_days': 3,
+    'speculative_retry': False,
+    'speculative_retry_delay': 30.0,
+}
+
 
 class Config:
-    """配置管理类"""
+    """配置管理类
+
+    配置在初始化时一次性加载，各配置对象首次访问时构建并缓存
+    """
 
     def __init__(self, config_path: str = "config.yaml"):
         """初始化配置"""
@@ -27,7 +50,7 @@ class Config:
         with open(self.config_path, 'r', encoding='utf-8') as f:
             return yaml.safe_load(f)
     
-    @property
+    @cached_property
     def rss_sources(self) -> list[RSSSource]:
         """获取所有启用的RSS源配置"""
         sources = []
@@ -39,7 +62,7 @@ class Config:
             ))
         return [s for s in sources if s.enabled]
     
-    @property
+    @cached_property
     def ai_config(self) -> AIConfig:
         """获取AI配置（1-Pass简化版）"""
         smart_ai_data = self._config.get('smart_ai', {})
@@ -58,7 +81,8 @@ class Config:
                 temperature=config.get('temperature', 0.3),
                 batch_size=config.get('batch_size', 10),
                 max_concurrent=config.get('max_concurrent', 3),
-                rate_limit_rpm=config.get('rate_limit_rpm', 60)
+                rate_limit_rpm=config.get('rate_limit_rpm', 60),
+                rate_limit_tpm=config.get('rate_limit_tpm', 0)
             )
         
         # 验证当前提供商的API key
@@ -101,21 +125,15 @@ class Config:
         )
     
     def _get_common_config(self, smart_ai_data: dict) -> dict:
-        """提取常用AI配置项"""
-        return {
-            'batch_size': smart_ai_data.get('batch_size', 10),
-            'max_concurrent': smart_ai_data.get('max_concurrent', 3),
-            'timeout_seconds': smart_ai_data.get('timeout_seconds', 90),
-            'max_output_items': smart_ai_data.get('max_output_items', 30),
-            'diversity_weight': smart_ai_data.get('diversity_weight', 0.3),
-            'fallback_enabled': smart_ai_data.get('fallback_enabled', True),
-            'fallback_chain': smart_ai_data.get('fallback_chain', ['deepseek', 'gemini']),
-            'category_min_guarantee': smart_ai_data.get('category_min_guarantee', {}),
-            'category_fixed_targets': smart_ai_data.get('category_fixed_targets', {}),
-            'use_fixed_proportion': smart_ai_data.get('use_fixed_proportion', False)
-        }
+        """提取常用AI配置项（缺失项使用 _COMMON_AI_DEFAULTS 中的默认值）"""
+        common_config = {}
+        for key, default in _COMMON_AI_DEFAULTS.items():
+            value = smart_ai_data.get(key, default)
+            # 使用默认值时复制一份，避免多个配置对象共享同一可变对象
+            common_config[key] = copy.copy(value) if value is default else value
+        return common_config
 
-    @property
+    @cached_property
     def output_config(self) -> OutputConfig:
         """获取输出配置"""
         output_data = self._config.get('output', {})
@@ -124,10 +142,11 @@ class Config:
             max_feed_items=output_data.get('max_feed_items', 50),
             archive_days=output_data.get('archive_days', 30),
             time_window_days=output_data.get('time_window_days', 1),
-            use_smart_switch=output_data.get('use_smart_switch', True)
+            use_smart_switch=output_data.get('use_smart_switch', True),
+            fetch_timeout_seconds=output_data.get('fetch_timeout_seconds', 30)
         )
     
-    @property
+    @cached_property
     def filter_config(self) -> FilterConfig:
         """获取过滤配置"""
         filter_data = self._config.get('filters', {})
@@ -5,6 +5,7 @@ News Coma 项目常量定义
 """
 from dataclasses import dataclass
 from enum import Enum
+from types import MappingProxyType
 
 
 class NewsCategory(str, Enum):
@@ -35,28 +36,34 @@ class DefaultScores:
     AUDIENCE_BREADTH = 3
     PRACTICALITY = 3
     TOTAL_SCORE = 3.0
+    # 默认结果标记字段：带此字段的结果不是模型真实评分，解析后不写入评分缓存
+    MARKER = "_default"
+    
+    # 默认结果模板（只读），生成时仅覆盖 news_index 和 summary，字段顺序保持不变
+    _TEMPLATE = MappingProxyType({
+        "news_index": None,
+        "chinese_title": None,
+        "category": CATEGORY,
+        "category_confidence": CONFIDENCE,
+        "importance": IMPORTANCE,
+        "timeliness": TIMELINESS,
+        "technical_depth": TECHNICAL_DEPTH,
+        "audience_breadth": AUDIENCE_BREADTH,
+        "practicality": PRACTICALITY,
+        "total_score": TOTAL_SCORE,
+        "summary": None,
+        MARKER: True,
+    })
     
     @classmethod
     def to_dict(cls, index: int, reason: str = "") -> dict:
         """生成默认分数字典"""
         summary = f"[处理失败: {reason[:50]}]" if reason else "[处理失败给予默认分]"
-        return {
-            "news_index": index,
-            "chinese_title": None,
-            "category": cls.CATEGORY,
-            "category_confidence": cls.CONFIDENCE,
-            "importance": cls.IMPORTANCE,
-            "timeliness": cls.TIMELINESS,
-            "technical_depth": cls.TECHNICAL_DEPTH,
-            "audience_breadth": cls.AUDIENCE_BREADTH,
-            "practicality": cls.PRACTICALITY,
-            "total_score": cls.TOTAL_SCORE,
-            "summary": summary
-        }
+        return {**cls._TEMPLATE, "news_index": index, "summary": summary}
 
 
 # 有效分类集合（用于验证）
-VALID_CATEGORIES = {cat.value for cat in NewsCategory}
+VALID_CATEGORIES = frozenset(cat.value for cat in NewsCategory)
 
 
 # 文件路径常量
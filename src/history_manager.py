@@ -4,8 +4,11 @@
 """
 import json
 import logging
+from collections.abc import Mapping
 from datetime import datetime, timedelta
+from itertools import islice
 from pathlib import Path
+from types import MappingProxyType
 from typing import Any
 
 logger = logging.getLogger(__name__)
@@ -14,6 +17,11 @@ logger = logging.getLogger(__name__)
 class HistoryManager:
     """历史数据管理器 - 扩展AI评分缓存功能"""
     
+    MAX_RUN_METRICS = 100           # 保留最近运行指标数量
+    # 评分缓存最大条目数：约3次运行（每次约200条，与score_cache_days默认3天对应）的评分量，
+    # 缓存随 data/history.json 每次运行提交，每条约0.5KB，上限约300KB
+    MAX_SCORE_CACHE_ENTRIES = 600
+    
     def _get_default_structure(self) -> dict[str, Any]:
         """获取默认数据结构"""
         return {
@@ -25,25 +33,14 @@ class HistoryManager:
             },
             "source_stats": {},
             "run_metrics": [],
-            "source_last_fetch": {}
+            "source_last_fetch": {},
+            "score_cache": {}
         }
 
     def _init_data_structure(self) -> None:
-        """初始化数据结构，确保所有必需字段存在"""
-        defaults = {
-            "run_metrics": list,
-            "source_last_fetch": dict,
-            "source_stats": dict,
-            "stats": lambda: {
-                "total_runs": 0,
-                "total_news_processed": 0,
-                "avg_news_per_run": 0
-            }
-        }
-
-        for key, factory in defaults.items():
-            if key not in self._data:
-                self._data[key] = factory()
+        """初始化数据结构，确保所有必需字段存在（缺失字段取默认结构中的值）"""
+        for key, value in self._get_default_structure().items():
+            self._data.setdefault(key, value)
 
     def __init__(self, history_path: str = "data/history.json"):
         self.history_path = Path(history_path)
@@ -60,17 +57,7 @@ class HistoryManager:
                 logger.error(f"加载历史数据失败: {e}")
         
         # 返回默认结构
-        return {
-            "last_run": None,
-            "stats": {
-                "total_runs": 0,
-                "total_news_processed": 0,
-                "avg_news_per_run": 0
-            },
-            "source_stats": {},
-            "run_metrics": [],
-            "source_last_fetch": {}  # RSS源最后获取时间（增量获取支持）
-        }
+        return self._get_default_structure()
     
     def save(self):
         """保存历史数据"""
@@ -110,13 +97,8 @@ class HistoryManager:
             )
         
         # 更新源统计
-        if "source_stats" not in self._data:
-            self._data["source_stats"] = {}
-        
         for source, count in source_stats.items():
-            if source not in self._data["source_stats"]:
-                self._data["source_stats"][source] = {"fetched": 0, "selected": 0}
-            self._data["source_stats"][source]["fetched"] += count
+            self._get_or_init_source_stats(source)["fetched"] += count
         
         self._data["last_run"] = run_time.isoformat()
         
@@ -131,27 +113,26 @@ class HistoryManager:
             "avg_score": kwargs.get("avg_score", 0),
         }
         
-        if "run_metrics" not in self._data:
-            self._data["run_metrics"] = []
-        
-        self._data["run_metrics"].append(run_metric)
+        run_metrics = self._data.setdefault("run_metrics", [])
+        run_metrics.append(run_metric)
         
-        # 只保留最近100次运行的详细指标
-        if len(self._data["run_metrics"]) > 100:
-            self._data["run_metrics"] = self._data["run_metrics"][-100:]
+        # 只保留最近N次运行的详细指标（原地删除，不复制列表）
+        del run_metrics[:-self.MAX_RUN_METRICS]
+    
+    def _get_or_init_source_stats(self, source_name: str) -> dict[str, int]:
+        """获取源统计桶，仅在写入路径按需初始化"""
+        source_stats = self._data.setdefault("source_stats", {})
+        return source_stats.get(source_name) or source_stats.setdefault(
+            source_name, {"fetched": 0, "selected": 0}
+        )
     
     def update_source_selected(self, source_name: str, count: int):
         """更新源选中统计"""
-        if "source_stats" not in self._data:
-            self._data["source_stats"] = {}
-        
-        if source_name not in self._data["source_stats"]:
-            self._data["source_stats"][source_name] = {"fetched": 0, "selected": 0}
-        self._data["source_stats"][source_name]["selected"] += count
+        self._get_or_init_source_stats(source_name)["selected"] += count
     
-    def get_stats(self) -> dict[str, Any]:
-        """获取统计信息"""
-        return self._data["stats"]
+    def get_stats(self) -> Mapping[str, Any]:
+        """获取统计信息（只读视图，避免调用方修改内部数据且无需复制）"""
+        return MappingProxyType(self._data["stats"])
     
     # ==================== 性能报告功能 ====================
     
@@ -161,24 +142,56 @@ class HistoryManager:
         if not metrics:
             return {"message": "暂无运行数据"}
         
-        # 取最近10次运行数据
+        # 取最近10次运行数据，单次遍历累计各项指标
         recent = metrics[-10:]
         n = len(recent)
         
-        total_api = sum(m.get("api_calls", 0) for m in recent)
-        total_duration = sum(m.get("duration_seconds", 0) for m in recent)
+        total_api = 0
+        total_duration = 0
+        for m in recent:
+            total_api += m.get("api_calls", 0)
+            total_duration += m.get("duration_seconds", 0)
         
         return {
             "recent_runs": n,
-            "avg_api_calls_per_run": total_api / n if n > 0 else 0,
-            "avg_duration_seconds": total_duration / n if n > 0 else 0,
+            "avg_api_calls_per_run": total_api / n,
+            "avg_duration_seconds": total_duration / n,
             "total_runs": self._data["stats"]["total_runs"],
         }
     
     def clear_old_entries(self, keep_days: int = 30):
-        """清理旧的历史记录(可选)"""
-        # 这里可以实现定期清理逻辑
-        pass
+        """清理超过保留天数或超出条目上限的AI评分缓存"""
+        cutoff = (datetime.now() - timedelta(days=keep_days)).isoformat()
+        cache = self._data.get("score_cache", {})
+        # ISO时间字符串可直接按字典序比较
+        expired = [key for key, entry in cache.items() if entry.get("cached_at", "") < cutoff]
+        for key in expired:
+            del cache[key]
+        
+        # 超出条目上限时按写入顺序淘汰最早的缓存
+        overflow = len(cache) - self.MAX_SCORE_CACHE_ENTRIES
+        evicted = list(islice(cache, overflow)) if overflow > 0 else []
+        for key in evicted:
+            del cache[key]
+        
+        if expired or evicted:
+            logger.info(
+                f"🧹 清理评分缓存: 过期 {len(expired)} 条 (保留{keep_days}天), "
+                f"超限 {len(evicted)} 条 (上限{self.MAX_SCORE_CACHE_ENTRIES}条)"
+            )
+    
+    # ==================== AI评分缓存 ====================
+    
+    def get_cached_score(self, cache_key: str) -> dict[str, Any] | None:
+        """获取缓存的AI评分结果，未命中返回None"""
+        return self._data.get("score_cache", {}).get(cache_key)
+    
+    def cache_score(self, cache_key: str, result: dict[str, Any]):
+        """缓存AI评分结果"""
+        self._data.setdefault("score_cache", {})[cache_key] = {
+            **result,
+            "cached_at": datetime.now().isoformat()
+        }
     
     # ==================== RSS源最后获取时间 (增量获取支持) ====================
     
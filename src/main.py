@@ -10,6 +10,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import logging
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 from src.config import Config
@@ -84,9 +85,11 @@ class RSSAggregator:
             duration = (end_time - start_time).total_seconds()
             run_metrics["duration_seconds"] = duration
             
-            # 记录API调用次数
-            provider_stats = self.scorer.batch_provider.get_stats()
-            run_metrics["api_calls"] = provider_stats.get('api_call_count', 0)
+            # 记录API调用次数和评分缓存命中情况（一次获取评分器统计快照）
+            scorer_stats = self.scorer.get_stats()
+            run_metrics["api_calls"] = scorer_stats['total_api_calls']
+            run_metrics["cache_hits"] = scorer_stats['cache_hits']
+            run_metrics["cache_misses"] = scorer_stats['cache_misses']
             
             # 6. 更新历史统计
             self._update_stats(start_time, news_items, top_items, run_metrics)
@@ -113,7 +116,7 @@ class RSSAggregator:
         )
         
         # 使用1-Pass SmartScorer
-        self.scorer = SmartScorer(config=self.config.ai_config)
+        self.scorer = SmartScorer(config=self.config.ai_config, history=self.history)
         
         self.markdown_gen = MarkdownGenerator(
             output_dir="docs",
@@ -145,6 +148,9 @@ class RSSAggregator:
         all_items = []
         source_stats = {}
         
+        # 确定各源的最后获取时间（全局fallback时间对所有源相同，只解析一次）
+        fetch_plan = []
+        fallback_last_fetch = self.history.get_fallback_last_fetch()
         for source in self.config.rss_sources:
             if not source.enabled:
                 continue
@@ -154,31 +160,43 @@ class RSSAggregator:
             
             # 如果该源没有记录，尝试使用fallback
             if not last_fetch:
-                last_fetch = self.history.get_fallback_last_fetch()
+                last_fetch = fallback_last_fetch
                 if last_fetch:
                     logger.info(f"⏰ {source.name} 使用全局fallback时间: {last_fetch}")
             
-            try:
-                # 获取该源的新闻（传入last_fetch实现增量获取）
-                items = self.fetcher._fetch_single(source, last_fetch)
-                all_items.extend(items)
-                source_stats[source.name] = len(items)
-                
-                # 更新该源的最后获取时间（使用当前时间）
-                self.history.update_source_last_fetch(source.name, datetime.now())
-                
-                if last_fetch:
-                    logger.info(
-                        f"✓ {source.name}: 增量获取 {len(items)} 条 "
-                        f"(上次: {last_fetch.strftime('%m-%d %H:%M')})"
-                    )
-                else:
-                    logger.info(f"✓ {source.name}: 全量获取 {len(items)} 条")
+            fetch_plan.append((source, last_fetch))
+        
+        # 使用线程池并行获取（网络I/O密集），按源配置顺序汇总结果
+        # 获取时间取提交前的时间点，避免结果等待期间发布的新闻在下次增量获取时遗漏
+        fetch_time = datetime.now()
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            futures = [
+                executor.submit(self.fetcher._fetch_single, source, last_fetch)
+                for source, last_fetch in fetch_plan
+            ]
+            
+            for (source, last_fetch), future in zip(fetch_plan, futures):
+                try:
+                    # 获取该源的新闻（传入last_fetch实现增量获取）
+                    items = future.result()
+                    all_items.extend(items)
+                    source_stats[source.name] = len(items)
                     
-            except Exception as e:
-                logger.error(f"❌ 获取 {source.name} 失败: {e}")
-                # 失败时不更新时间戳，下次会重试
-                continue
+                    # 更新该源的最后获取时间
+                    self.history.update_source_last_fetch(source.name, fetch_time)
+                    
+                    if last_fetch:
+                        logger.info(
+                            f"✓ {source.name}: 增量获取 {len(items)} 条 "
+                            f"(上次: {last_fetch.strftime('%m-%d %H:%M')})"
+                        )
+                    else:
+                        logger.info(f"✓ {source.name}: 全量获取 {len(items)} 条")
+                        
+                except Exception as e:
+                    logger.error(f"❌ 获取 {source.name} 失败: {e}")
+                    # 失败时不更新时间戳，下次会重试
+                    continue
         
         logger.info(f"📊 总计: 获取 {len(all_items)} 条")
         logger.info(f"📊 各源统计: {source_stats}")
@@ -241,12 +259,16 @@ class RSSAggregator:
         for item in all_items:
             source_stats[item.source] = source_stats.get(item.source, 0) + 1
         
-        # 计算平均评分
-        avg_score = 0
-        if selected_items:
-            scores = [item.ai_score for item in selected_items if item.ai_score is not None]
-            if scores:
-                avg_score = sum(scores) / len(scores)
+        # 单次遍历同时累计平均评分所需的数量/总分和各源选中数
+        score_count = 0
+        score_total = 0.0
+        selected_by_source: dict[str, int] = {}
+        for item in selected_items:
+            if item.ai_score is not None:
+                score_count += 1
+                score_total += item.ai_score
+            selected_by_source[item.source] = selected_by_source.get(item.source, 0) + 1
+        avg_score = score_total / score_count if score_count else 0
         
         # 准备详细指标
         metrics = run_metrics or {}
@@ -255,9 +277,12 @@ class RSSAggregator:
         # 更新历史
         self.history.update_stats(run_time, len(all_items), source_stats, **metrics)
         
-        # 更新源选中统计
-        for item in selected_items:
-            self.history.update_source_selected(item.source, 1)
+        # 更新源选中统计（按源汇总后一次写入）
+        for source, count in selected_by_source.items():
+            self.history.update_source_selected(source, count)
+        
+        # 清理过期评分缓存
+        self.history.clear_old_entries(keep_days=self.scorer.config.score_cache_days)
         
         # 保存
         self.history.save()
@@ -4,17 +4,35 @@ Markdown生成模块
 """
 import logging
 import re
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 
 from src.models import NewsItem
 
 logger = logging.getLogger(__name__)
 
+# CJK统一汉字（基本区）
+_CJK_PATTERN = re.compile('[\u4e00-\u9fff]')
+
+# 归档合并用到的条目解析模式
+# 条目起始行：相邻两处起始位置之间即为一个完整条目（最后一条延伸到文末）
+_ENTRY_BOUNDARY_PATTERN = re.compile(r'###\s+\d+\.\s+')
+_ENTRY_HEADER_PATTERN = re.compile(r'###\s+\d+\.\s+(\[.*?\]\((.+?)\))')
+_ENTRY_START_PATTERN = re.compile(r'###\s+\d+\.')
+_ENTRY_NUMBER_PATTERN = re.compile(r'^###\s+\d+\.\s+')
+_FOOTER_PATTERN = re.compile(r'##\s+📮\s+订阅')
+
 
 class MarkdownGenerator:
     """Markdown生成器"""
     
+    # 板块标题与分类的对应关系（按输出顺序）
+    _SECTIONS = (
+        ("💰 财经新闻", "财经"),
+        ("🔬 科技新闻", "科技"),
+        ("🏛️ 社会政治", "社会政治"),
+    )
+    
     def __init__(self, output_dir: str = "docs", archive_dir: str = "archive"):
         self.output_dir = Path(output_dir)
         self.archive_dir = Path(archive_dir)
@@ -59,12 +77,10 @@ class MarkdownGenerator:
     def _group_by_category(self, items: list[NewsItem]) -> dict[str, list[NewsItem]]:
         """按AI分类分组新闻"""
         groups = {"财经": [], "科技": [], "社会政治": [], "其他": []}
+        other = groups["其他"]
         for item in items:
-            category = getattr(item, 'ai_category', '其他')
-            if category in groups:
-                groups[category].append(item)
-            else:
-                groups["其他"].append(item)
+            # 未知分类归入"其他"，单次字典查找完成分发
+            groups.get(item.ai_category, other).append(item)
         return groups
 
     def _is_chinese_title(self, title: str) -> bool:
@@ -81,12 +97,13 @@ class MarkdownGenerator:
         Returns:
             bool: 是否为中文标题
         """
-        if not title:
+        # 纯ASCII标题不可能含中文字符，无需统计
+        if not title or title.isascii():
             return False
 
-        # 统计中文字符数量
-        chinese_chars = sum(1 for char in title if '\u4e00' <= char <= '\u9fff')
-        total_chars = len(title.replace(' ', '').replace('-', ''))
+        # 统计中文字符数量（正则在C层一次扫描完成计数）
+        chinese_chars = len(_CJK_PATTERN.findall(title))
+        total_chars = len(title) - title.count(' ') - title.count('-')
 
         if total_chars == 0:
             return False
@@ -109,6 +126,9 @@ class MarkdownGenerator:
         Returns:
             str: 用于显示的标题
         """
+        # 无译名或译名与原标题相同时，两种分支结果都是原标题，无需检测语言
+        if not item.translated_title or item.translated_title == item.title:
+            return item.title
         if self._is_chinese_title(item.title):
             # 原文是中文，直接使用
             return item.title
@@ -118,14 +138,11 @@ class MarkdownGenerator:
 
     def _build_content(self, items: list[NewsItem], timestamp: datetime) -> str:
         """构建Markdown内容（三板块分区布局）"""
-        from datetime import timedelta
         beijing_time = timestamp + timedelta(hours=8)
 
-        # 按 ai_category 分组
-        groups = self._group_by_category(items)
-        finance_items = groups["财经"]
-        tech_items = groups["科技"]
-        politics_items = groups["社会政治"]
+        # 按AI评分排序一次后按 ai_category 分组（分组保持排序顺序）
+        sorted_items = sorted(items, key=lambda x: (x.ai_score or 0, x.published_at), reverse=True)
+        groups = self._group_by_category(sorted_items)
 
         # 计算各板块精选数量
         total_count = len(items)
@@ -140,17 +157,11 @@ class MarkdownGenerator:
 
 """
 
-        # 构建三板块内容
-        body = ""
-
-        # 财经板块
-        body += self._build_section("💰 财经新闻", finance_items, "财经")
-
-        # 科技板块
-        body += self._build_section("🔬 科技新闻", tech_items, "科技")
-
-        # 社会政治板块
-        body += self._build_section("🏛️ 社会政治", politics_items, "社会政治")
+        # 构建三板块内容（财经、科技、社会政治）
+        body = "".join(
+            self._build_section(section_title, groups[category], category)
+            for section_title, category in self._SECTIONS
+        )
 
         # 页脚
         footer = """## 📮 订阅
@@ -165,7 +176,7 @@ class MarkdownGenerator:
         return header + body + footer
 
     def _build_section(self, title: str, items: list[NewsItem], category: str) -> str:
-        """构建单个板块的内容"""
+        """构建单个板块的内容（items需已按评分降序排列）"""
         if not items:
             return f"""## {title} (0条)
 
@@ -175,20 +186,18 @@ class MarkdownGenerator:
 
 """
 
-        # 按AI评分排序
-        sorted_items = sorted(items, key=lambda x: (x.ai_score or 0, x.published_at), reverse=True)
-
-        section = f"""## {title} ({len(items)}条)
+        # 逐条收集后一次拼接，避免字符串反复累加
+        parts = [f"""## {title} ({len(items)}条)
 
-精选 **{len(sorted_items)}** 条{category}新闻
+精选 **{len(items)}** 条{category}新闻
 
-"""
+"""]
 
-        for i, item in enumerate(sorted_items, 1):
+        for i, item in enumerate(items, 1):
             # 根据原文标题语言决定显示哪个标题
             display_title = self._get_display_title(item)
 
-            section += f"""### {i}. [{display_title}]({item.link})
+            parts.append(f"""### {i}. [{display_title}]({item.link})
 
 **📌 来源**: {item.source} | **🏏️ AI分类**: {item.ai_category} | **⭐ 评分**: {item.ai_score or 'N/A'}/10
 
@@ -197,35 +206,33 @@ class MarkdownGenerator:
 
 ---
 
-"""
+""")
 
-        return section
+        return "".join(parts)
     
 
     def _parse_entries(self, content: str) -> dict:
         """解析内容中的新闻条目，返回 {url: (title, full_entry_content)}"""
         entries = {}
-        entry_pattern = r'###\s+\d+\.\s+(.*?)(?=###\s+\d+\.\s+|\Z)'
-        link_pattern = r'^###\s+\d+\.\s+\[.*?\]\((.+?)\)'
-
-        for match in re.finditer(entry_pattern, content, re.DOTALL):
-            entry_content = match.group(0)
-            link_match = re.search(link_pattern, entry_content, re.MULTILINE)
-            if link_match:
-                url = link_match.group(1)
-                title_match = re.match(r'###\s+\d+\.\s+(\[.+?\]\(.+?\))', entry_content)
-                title = title_match.group(1) if title_match else ""
+        # 先定位所有条目起始位置再按区间切片，避免非贪婪匹配在每个字符上尝试前瞻
+        starts = [match.start() for match in _ENTRY_BOUNDARY_PATTERN.finditer(content)]
+        for start, end in zip(starts, starts[1:] + [len(content)]):
+            entry_content = content[start:end]
+            # 条目标题行一次匹配同时取得标题链接和URL
+            header_match = _ENTRY_HEADER_PATTERN.match(entry_content)
+            if header_match:
+                title, url = header_match.groups()
                 entries[url] = (title, entry_content)
         return entries
 
     def _extract_header(self, content: str) -> str:
         """提取header（第一个 ### 之前的内容）"""
-        first_entry_match = re.search(r'###\s+\d+\.', content)
+        first_entry_match = _ENTRY_START_PATTERN.search(content)
         return content[:first_entry_match.start()] if first_entry_match else ""
 
     def _extract_footer(self, content: str) -> str:
         """提取footer（订阅部分）"""
-        footer_match = re.search(r'##\s+📮\s+订阅', content)
+        footer_match = _FOOTER_PATTERN.search(content)
         return content[footer_match.start():] if footer_match else ""
 
     def _merge_archive_content(self, existing: str, new: str) -> str:
@@ -260,14 +267,11 @@ class MarkdownGenerator:
             # 重新生成条目内容，重新编号
             body_parts = []
             for idx, (url, (title, entry_content)) in enumerate(merged_entries.items(), 1):
-                # 替换条目编号
-                renumbered_entry = re.sub(
-                    r'^###\s+\d+\.\s+',
-                    f'### {idx}. ',
-                    entry_content,
-                    count=1
-                )
-                body_parts.append(renumbered_entry)
+                # 替换条目编号（现有条目合并后位置不变，编号已正确时无需重写）
+                number = f'### {idx}. '
+                if not entry_content.startswith(number + '['):
+                    entry_content = _ENTRY_NUMBER_PATTERN.sub(number, entry_content, count=1)
+                body_parts.append(entry_content)
 
             # 组装最终内容
             result = header + ''.join(body_parts)
@@ -5,11 +5,15 @@
 from dataclasses import dataclass, field
 from datetime import datetime
 
+from dateutil import parser as date_parser
 
-@dataclass
+
+@dataclass(slots=True)
 class NewsItem:
     """标准化新闻条目
 
+    使用 __slots__：评分阶段逐条回写AI字段，槽位属性读写更快且每条新闻不再携带 __dict__。
+
     字段说明:
     - summary: RSS源提供的原始摘要，轻量级，用于语义去重和快速浏览
     - content: 最完整的内容正文，智能选择summary或content字段中更详细的那个，
@@ -35,10 +39,59 @@ class NewsItem:
     def __post_init__(self):
         """初始化后处理"""
         if isinstance(self.published_at, str):
-            from dateutil import parser as date_parser
             self.published_at = date_parser.parse(self.published_at)
 
 
+@dataclass(slots=True, frozen=True)
+class ScoreResult:
+    """AI评分结果快照（用于评分缓存回填和重复新闻复用）"""
+    ai_score: float | None
+    ai_category: str
+    ai_category_confidence: float
+    ai_summary: str | None
+    translated_title: str | None
+    
+    @classmethod
+    def from_item(cls, item: NewsItem) -> 'ScoreResult':
+        """从已评分的新闻条目提取评分结果"""
+        return cls(
+            ai_score=item.ai_score,
+            ai_category=item.ai_category,
+            ai_category_confidence=item.ai_category_confidence,
+            ai_summary=item.ai_summary,
+            translated_title=item.translated_title
+        )
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ScoreResult':
+        """从缓存字典创建实例（忽略额外字段）"""
+        return cls(
+            ai_score=data['ai_score'],
+            ai_category=data['ai_category'],
+            ai_category_confidence=data['ai_category_confidence'],
+            ai_summary=data['ai_summary'],
+            translated_title=data['translated_title']
+        )
+    
+    def to_dict(self) -> dict:
+        """转换为可JSON序列化的字典"""
+        return {
+            'ai_score': self.ai_score,
+            'ai_category': self.ai_category,
+            'ai_category_confidence': self.ai_category_confidence,
+            'ai_summary': self.ai_summary,
+            'translated_title': self.translated_title
+        }
+    
+    def apply_to(self, item: NewsItem) -> None:
+        """将评分结果写入新闻条目"""
+        item.ai_score = self.ai_score
+        item.ai_category = self.ai_category
+        item.ai_category_confidence = self.ai_category_confidence
+        item.ai_summary = self.ai_summary
+        item.translated_title = self.translated_title
+
+
 @dataclass
 class RSSSource:
     """RSS源配置"""
@@ -58,6 +111,7 @@ class ProviderConfig:
     batch_size: int = 10
     max_concurrent: int = 3
     rate_limit_rpm: int = 60  # 每分钟请求限制
+    rate_limit_tpm: int = 0   # 每分钟token限制（0表示不限制）
 
 
 @dataclass
@@ -131,6 +185,14 @@ class AIConfig:
     max_retries: int = 2                            # 最大重试次数
     retry_delay: float = 1.0                        # 重试间隔（秒）
 
+    # 评分缓存配置（新增）
+    score_cache_enabled: bool = True                # 是否复用历史评分结果
+    score_cache_days: int = 3                       # 评分缓存保留天数
+    
+    # 推测重试配置（新增，默认关闭）
+    speculative_retry: bool = False                 # 主请求超时未返回时并发发起第二个请求
+    speculative_retry_delay: float = 30.0           # 发起第二个请求前的等待时间（秒）
+
 
 
 @dataclass
@@ -141,6 +203,7 @@ class OutputConfig:
     archive_days: int = 30
     time_window_days: int = 1
     use_smart_switch: bool = True  # 是否启用智能切换
+    fetch_timeout_seconds: int = 30  # 单个RSS源下载超时（秒）
 
 
 @dataclass
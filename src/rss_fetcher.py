@@ -6,6 +6,8 @@ RSS获取模块
 import hashlib
 import logging
 import re
+import time
+import urllib.request
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 
@@ -16,6 +18,53 @@ from src.models import NewsItem, RSSSource, OutputConfig, FilterConfig
 
 logger = logging.getLogger(__name__)
 
+# HTML实体解码表（按顺序替换，&amp; 需在 &lt;/&gt; 之后处理）
+_HTML_ENTITIES = (
+    ('&lt;', '<'),
+    ('&gt;', '>'),
+    ('&amp;', '&'),
+    ('&quot;', '"'),
+    ('&#39;', "'"),
+    ('&nbsp;', ' '),
+)
+
+# HTML清理正则（模块级预编译，避免每条摘要都经过 re 模块的缓存查找）
+_SCRIPT_STYLE_PATTERN = re.compile(r'<(script|style)[^>]*>[^<]*</\1>', re.DOTALL)
+_TAG_PATTERN = re.compile(r'<[^>]+>')
+
+
+def _strip_html(html: str) -> str:
+    """移除HTML标签并解码常见实体"""
+    # 纯文本（无标签、无实体）无需正则处理
+    if '<' not in html and '&' not in html:
+        return html.strip()
+    # 移除script和style标签及其内容（绝大多数摘要不含这两种标签，先用子串查找排除）
+    if '<script' in html or '<style' in html:
+        html = _SCRIPT_STYLE_PATTERN.sub('', html)
+    # 移除所有HTML标签
+    html = _TAG_PATTERN.sub('', html)
+    # 解码HTML实体（不含 & 时六个实体都不可能出现，跳过逐个替换）
+    if '&' in html:
+        for entity, char in _HTML_ENTITIES:
+            html = html.replace(entity, char)
+    return html.strip()
+
+
+class _TimeoutHandler(urllib.request.BaseHandler):
+    """为feedparser发起的请求设置超时（feedparser.parse 本身不支持timeout参数）
+
+    仅在请求预处理阶段写入超时，重定向、HTTP状态和条件请求仍由feedparser处理。
+    """
+
+    def __init__(self, timeout: float):
+        self._timeout = timeout
+
+    def http_request(self, request: urllib.request.Request) -> urllib.request.Request:
+        request.timeout = self._timeout
+        return request
+
+    https_request = http_request
+
 
 class RSSFetcher:
     """RSS获取器 - 支持语义去重"""
@@ -30,6 +79,7 @@ class RSSFetcher:
         self.output_config = output_config
         self.filter_config = filter_config
         self.time_window = timedelta(days=output_config.time_window_days)
+        self._fetch_timeout = getattr(output_config, 'fetch_timeout_seconds', 30)
         
         # 轻量级语义去重配置 (TF-IDF版，GitHub Actions友好，~10MB内存)
         self._semantic_dedup_enabled = getattr(filter_config, 'use_semantic_dedup', True)
@@ -121,8 +171,8 @@ class RSSFetcher:
         items = []
         
         try:
-            # 解析RSS feed
-            feed = feedparser.parse(source.url)
+            # 下载并解析RSS feed
+            feed = self._download_feed(source.url)
             
             if feed.bozo:  # 解析警告
                 logger.warning(f"⚠️ {source.name} RSS解析警告: {feed.bozo_exception}")
@@ -139,11 +189,11 @@ class RSSFetcher:
             
             for entry in feed.entries:
                 try:
-                    item = self._parse_entry(entry, source)
-                    
                     # 时间过滤：只保留 cutoff_time 之后的新闻
-                    if item.published_at > cutoff_time:
-                        items.append(item)
+                    # 先只解析发布时间，窗口外的条目（增量模式下占多数）无需清理HTML和生成ID
+                    published = self._parse_published(entry, source)
+                    if published > cutoff_time:
+                        items.append(self._parse_entry(entry, source, published))
                     
                 except Exception as e:
                     logger.warning(f"⚠️ 解析条目失败: {e}")
@@ -155,20 +205,12 @@ class RSSFetcher:
         
         return items
     
-    def _parse_entry(self, entry, source: RSSSource) -> NewsItem:
-        """将feedparser entry解析为NewsItem"""
-        # 获取标题
-        title = entry.get('title', '无标题').strip()
-        
-        # 获取链接
-        link = entry.get('link', '')
-        if not link and 'links' in entry:
-            for l in entry.links:
-                if l.get('type') == 'text/html':
-                    link = l.get('href', '')
-                    break
-        
-        # 获取发布时间
+    def _download_feed(self, url: str) -> feedparser.FeedParserDict:
+        """下载并解析RSS feed（带超时，避免单个源无响应时阻塞整体获取）"""
+        return feedparser.parse(url, handlers=[_TimeoutHandler(self._fetch_timeout)])
+    
+    def _parse_published(self, entry, source: RSSSource) -> datetime:
+        """解析条目发布时间（缺失或无法解析时使用当前时间，未来时间按当前时间处理）"""
         published = datetime.now()
         if 'published_parsed' in entry:
             published = datetime(*entry.published_parsed[:6])
@@ -178,7 +220,7 @@ class RSSFetcher:
             try:
                 published = date_parser.parse(entry.published)
             except (ValueError, TypeError) as e:
-                logger.debug(f"⚠️ {source.name} 条目发布时间解析失败: {e}")
+                logger.debug("⚠️ %s 条目发布时间解析失败: %s", source.name, e)
                 published = datetime.now()
         
         # 边界情况处理：检查时间戳是否在未来
@@ -187,14 +229,32 @@ class RSSFetcher:
                 f"⚠️ {source.name} 条目时间在未来: {published}，使用当前时间"
             )
             published = datetime.now()
+        return published
+    
+    def _parse_entry(self, entry, source: RSSSource, published: datetime | None = None) -> NewsItem:
+        """将feedparser entry解析为NewsItem（published 为已解析的发布时间，未提供时自行解析）"""
+        # 获取标题
+        title = entry.get('title', '无标题').strip()
+        
+        # 获取链接
+        link = entry.get('link', '')
+        if not link and 'links' in entry:
+            for l in entry.links:
+                if l.get('type') == 'text/html':
+                    link = l.get('href', '')
+                    break
+        
+        # 获取发布时间
+        if published is None:
+            published = self._parse_published(entry, source)
         
         # 获取原始内容
         summary_raw = entry.get('summary', '') or entry.get('description', '')
         content_raw = entry.get('content', [{}])[0].get('value', '') if 'content' in entry else ''
 
-        # 清理HTML
+        # 清理HTML（不少源的content与summary是同一段HTML，相同时只清理一次）
         summary_clean = self._clean_html(summary_raw)
-        content_clean = self._clean_html(content_raw)
+        content_clean = summary_clean if content_raw == summary_raw else self._clean_html(content_raw)
 
         # 智能选择完整内容
         if self._use_full_content:
@@ -230,7 +290,6 @@ class RSSFetcher:
         去掉低效的Levenshtein字符级去重，保留URL精确去重 + TF-IDF语义去重
         优势：更好的中文支持、更高的去重准确率、更简洁的代码
         """
-        import time
         start_time = time.time()
         
         if len(items) <= 1:
@@ -249,7 +308,7 @@ class RSSFetcher:
             unique_by_url.append(item)
         
         if url_duplicates > 0:
-            logger.debug(f"🔗 URL去重移除 {url_duplicates} 条")
+            logger.debug("🔗 URL去重移除 %d 条", url_duplicates)
         
         # 步骤2：语义去重（核心逻辑 - 使用TF-IDF向量化 + 余弦相似度）
         if len(unique_by_url) > 1:
@@ -284,49 +343,47 @@ class RSSFetcher:
             return items
         
         try:
-            from sklearn.metrics.pairwise import cosine_similarity
+            from sklearn.metrics.pairwise import linear_kernel
             import numpy as np
             
-            # 准备文本 (标题 + 摘要前100字)
-            texts = []
-            for item in items:
-                text = f"{item.title} {item.summary[:100]}"
-                texts.append(text.lower())
+            # 准备文本 (标题 + 摘要前100字)；向量化器已配置lowercase=True，无需预先转小写
+            texts = [f"{item.title} {item.summary[:100]}" for item in items]
             
             # TF-IDF编码 (内存友好)
             logger.info(f"🧮 TF-IDF编码 {len(texts)} 条新闻...")
             tfidf_matrix = vectorizer.fit_transform(texts)
             
-            # 计算相似度矩阵
-            similarity_matrix = cosine_similarity(tfidf_matrix)
+            # 计算相似度矩阵：TF-IDF行向量已做L2归一化，点积即余弦相似度，无需再次归一化
+            similarity_matrix = linear_kernel(tfidf_matrix)
             
-            # 聚类去重
+            # 聚类去重：阈值比较对整个矩阵一次完成，逐行只在预分配的缓冲区上做按位运算，
+            # 循环中不再为每条新闻分配临时数组
+            similar = similarity_matrix > self._semantic_threshold
+            np.fill_diagonal(similar, False)
+            remaining = np.ones(len(items), dtype=bool)
+            similar_mask = np.empty(len(items), dtype=bool)
             unique_items = []
-            processed_indices = set()
             semantic_duplicates = 0
-            
+
             for i, item in enumerate(items):
-                if i in processed_indices:
+                if not remaining[i]:
                     continue
-                
-                # 找到所有语义相似的新闻
-                similar_indices = [
-                    j for j in range(len(items))
-                    if similarity_matrix[i][j] > self._semantic_threshold
-                    and j != i and j not in processed_indices
-                ]
-                
-                if similar_indices:
+
+                # 找到所有语义相似且尚未处理的新闻
+                np.logical_and(similar[i], remaining, out=similar_mask)
+                similar_count = int(np.count_nonzero(similar_mask))
+
+                if similar_count:
                     logger.debug(
                         f"🎯 TF-IDF去重: '{item.title[:40]}...' "
-                        f"与 {len(similar_indices)} 条相似"
+                        f"与 {similar_count} 条相似"
                     )
-                    semantic_duplicates += len(similar_indices)
-                
+                    semantic_duplicates += similar_count
+
                 # 保留第一条，标记其余为重复
                 unique_items.append(item)
-                processed_indices.add(i)
-                processed_indices.update(similar_indices)
+                remaining[i] = False
+                np.logical_and(remaining, np.logical_not(similar_mask, out=similar_mask), out=remaining)
             
             self.semantic_duplicates_removed = semantic_duplicates
             
@@ -345,15 +402,7 @@ class RSSFetcher:
         """简单清理HTML标签"""
         if not html:
             return ""
-        # 移除script和style标签及其内容
-        html = re.sub(r'<(script|style)[^>]*>[^<]*</\1>', '', html, flags=re.DOTALL)
-        # 移除所有HTML标签
-        html = re.sub(r'<[^>]+>', '', html)
-        # 解码HTML实体
-        html = html.replace('&lt;', '<').replace('&gt;', '>')
-        html = html.replace('&amp;', '&').replace('&quot;', '"')
-        html = html.replace('&#39;', "'").replace('&nbsp;', ' ')
-        return html.strip()
+        return _strip_html(html)
     
     def get_stats(self) -> dict:
         """获取去重统计"""
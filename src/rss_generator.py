@@ -2,6 +2,7 @@
 RSS订阅文件生成模块
 负责基于Markdown文件生成RSS feed.xml文件
 """
+import heapq
 import logging
 import os
 import re
@@ -13,6 +14,63 @@ from pathlib import Path
 logger = logging.getLogger(__name__)
 
 
+# 列表项（- 或 * 开头）
+_LIST_ITEM_PATTERN = re.compile(r'^[-\*]\s+(.+)$')
+
+# RFC822日期使用英文星期与月份缩写（不受系统locale影响）
+_RFC822_DAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+_RFC822_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+                  'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+# 从Markdown内容提取日期的模式（按优先级排列）：完整日期时间、更新日期、标题日期
+_DATETIME_PATTERNS = (
+    re.compile(r'更新时间:\s*(\d{4})年(\d{2})月(\d{2})日\s*(\d{2}):(\d{2})'),
+    re.compile(r'更新时间:\s*(\d{4})年(\d{2})月(\d{2})日'),
+    re.compile(r'#\s*(\d{4})年(\d{2})月(\d{2})日'),
+)
+# 新闻数量（本期精选 **N** 条）与订阅部分起始标题
+_NEWS_COUNT_PATTERN = re.compile(r'本期精选\s*\*\*(\d+)\*\*\s*条')
+_SUBSCRIPTION_PATTERN = re.compile(r'##\s*📮\s*订阅')
+# 归档文件名 YYYY-MM-DD.md
+_ARCHIVE_NAME_PATTERN = re.compile(r'(\d{4})-(\d{2})-(\d{2})\.md$')
+
+
+def _archive_date_from_name(file_name: str) -> datetime | None:
+    """从归档文件名 (YYYY-MM-DD.md) 解析日期，不符合格式时返回None"""
+    match = _ARCHIVE_NAME_PATTERN.match(file_name)
+    if not match:
+        return None
+    try:
+        return datetime(*map(int, match.groups()))
+    except ValueError:
+        return None
+
+
+# 一至三级标题：按 # 的数量决定标题级别
+_HEADING_PATTERN = re.compile(r'^(#{1,3})\s+(.+?)$', re.MULTILINE)
+
+
+def _replace_heading(match: re.Match) -> str:
+    """将匹配到的Markdown标题替换为对应级别的HTML标题"""
+    level = len(match.group(1))
+    return f'<h{level}>{match.group(2)}</h{level}>'
+
+
+# 粗体、引用块、链接：替换为固定模板，由正则引擎直接展开，无需逐次回调Python函数
+_BOLD_PATTERN = re.compile(r'\*\*([^*]+?)\*\*')
+_QUOTE_PATTERN = re.compile(r'^>\s+(.+?)$', re.MULTILINE)
+_LINK_PATTERN = re.compile(r'\[([^\]]+)\]\(([^\)]+)\)')
+
+
+def _split_repository(repo_url: str) -> tuple[str, str]:
+    """将 GITHUB_REPOSITORY（owner/repo）拆分为用户名和仓库名，格式不符时使用默认值"""
+    parts = repo_url.split('/')
+    if len(parts) != 2:
+        return 'username', 'news'
+    owner, name = parts
+    return owner, name
+
+
 class RSSGenerator:
     """基于Markdown文件的RSS订阅文件生成器"""
     
@@ -39,89 +97,58 @@ class RSSGenerator:
         
         html = markdown_text
 
-        # 1. 转换一级标题 (# → <h1>)
-        html = re.sub(r'^#\s+(.+?)$', r'<h1>\1</h1>', html, flags=re.MULTILINE)
-
-        # 2. 转换二级标题 (## → <h2>)
-        html = re.sub(r'^##\s+(.+?)$', r'<h2>\1</h2>', html, flags=re.MULTILINE)
-
-        # 3. 转换三级标题 (### → <h3>)
-        html = re.sub(r'^###\s+(.+?)$', r'<h3>\1</h3>', html, flags=re.MULTILINE)
+        # 1-3. 转换一至三级标题 (# / ## / ### → <h1>/<h2>/<h3>)，单次扫描完成
+        html = _HEADING_PATTERN.sub(_replace_heading, html)
 
         # 4. 转换粗体 (** → <strong>)
-        html = re.sub(r'\*\*([^*]+?)\*\*', r'<strong>\1</strong>', html)
+        html = _BOLD_PATTERN.sub(r'<strong>\1</strong>', html)
 
         # 5. 转换引用块 (> → <blockquote>)
-        def replace_quote(match):
-            quote_content = match.group(1)
-            return f'<blockquote>{quote_content}</blockquote>'
-        html = re.sub(r'^>\s+(.+?)$', replace_quote, html, flags=re.MULTILINE)
+        html = _QUOTE_PATTERN.sub(r'<blockquote>\1</blockquote>', html)
 
         # 6. 转换链接 ([文本](URL) → <a>)
-        def replace_link(match):
-            link_text = match.group(1)
-            url = match.group(2)
-            return f'<a href="{url}">{link_text}</a>'
-        html = re.sub(r'\[([^\]]+)\]\(([^\)]+)\)', replace_link, html)
-
-        # 7. 转换列表 (- → <ul><li>)
-        lines = html.split('\n')
+        html = _LINK_PATTERN.sub(r'<a href="\2">\1</a>', html)
+
+        # 7-9. 单次逐行扫描完成：列表 (- → <ul><li>)、分隔线 (--- → <hr/>)、段落包裹
         result_lines = []
-        in_list = False
         list_items = []
-        
-        for line in lines:
+        current_para = []
+
+        def flush_para():
+            if current_para:
+                result_lines.append(f'<p>{" ".join(current_para)}</p>')
+                current_para.clear()
+
+        def flush_list():
+            if list_items:
+                # 列表块以HTML标签开头，先结束当前段落
+                flush_para()
+                result_lines.append('<ul>')
+                result_lines.extend(list_items)
+                result_lines.append('</ul>')
+                list_items.clear()
+
+        for line in html.split('\n'):
             stripped = line.strip()
-            list_match = re.match(r'^[-\*]\s+(.+)$', stripped)
-            
+            list_match = _LIST_ITEM_PATTERN.match(stripped)
             if list_match:
-                if not in_list:
-                    in_list = True
-                    list_items = []
-                item_text = list_match.group(1)
-                list_items.append(f'<li>{item_text}</li>')
-            else:
-                if in_list:
-                    result_lines.append('<ul>')
-                    result_lines.extend(list_items)
-                    result_lines.append('</ul>')
-                    in_list = False
-                    list_items = []
-                result_lines.append(line)
-        
-        if in_list:
-            result_lines.append('<ul>')
-            result_lines.extend(list_items)
-            result_lines.append('</ul>')
-        
-        html = '\n'.join(result_lines)
+                list_items.append(f'<li>{list_match.group(1)}</li>')
+                continue
+            flush_list()
 
-        # 8. 转换分隔线 (--- → <hr/>)
-        html = re.sub(r'^---\s*$', '<hr/>', html, flags=re.MULTILINE)
+            # 分隔线：行首 --- 且其后只有空白
+            if line.startswith('---') and not line[3:].strip():
+                line = stripped = '<hr/>'
 
-        # 9. 包裹段落
-        lines = html.split('\n')
-        result_lines = []
-        current_para = []
-        
-        for line in lines:
-            stripped = line.strip()
-            
             if not stripped or (stripped.startswith('<') and stripped.endswith('>')):
-                if current_para:
-                    para_text = ' '.join(current_para)
-                    if para_text:
-                        result_lines.append(f'<p>{para_text}</p>')
-                    current_para = []
+                flush_para()
                 if stripped:
                     result_lines.append(line)
             else:
                 current_para.append(stripped)
-        
-        if current_para:
-            para_text = ' '.join(current_para)
-            if para_text:
-                result_lines.append(f'<p>{para_text}</p>')
+
+        flush_list()
+        flush_para()
         
         html = '\n'.join(result_lines)
         
@@ -140,35 +167,66 @@ class RSSGenerator:
         # 收集所有Markdown文件
         markdown_files = self._collect_markdown_files(required_source)
         
-        # 解析文件信息
-        file_infos = []
-        for file_path in markdown_files:
-            try:
-                file_info = self._parse_markdown_file(file_path)
-                if file_info:
-                    file_infos.append(file_info)
-            except Exception as e:
-                logger.warning(f"解析Markdown文件失败 {file_path}: {e}")
-        
-        # 按日期排序(最新的在前)
-        file_infos.sort(key=lambda x: x.get('date', datetime.min), reverse=True)
+        # 解析文件信息（较旧的归档文件不会进入feed，无需读取）
+        file_infos = self._parse_candidate_files(markdown_files)
         
-        # 限制数量
-        file_infos = file_infos[:self.max_items]
+        # 按日期取最新的max_items个（最新的在前），无需对全部文件排序
+        file_infos = heapq.nlargest(
+            self.max_items, file_infos, key=lambda x: x.get('date', datetime.min)
+        )
         
         # 生成XML
         rss_xml = self._build_rss_xml(file_infos)
         
         # 写入文件
         self.feed_path.write_text(rss_xml, encoding='utf-8')
-        # 记录智能切换统计信息
-        if self.use_smart_switch:
+        # 记录智能切换统计信息（仅在INFO级别输出时才需要遍历统计）
+        if self.use_smart_switch and logger.isEnabledFor(logging.INFO):
             self._log_smart_switch_stats(file_infos)
         
         logger.info(f"已更新RSS feed: {self.feed_path} ({len(file_infos)} 个文件)")
         
         return rss_xml
     
+    def _parse_candidate_files(self, markdown_files: list[Path]) -> list[dict]:
+        """解析可能进入feed的Markdown文件信息（保持原文件顺序）
+
+        归档文件的日期可直接由文件名确定：按日期从新到旧解析，成功解析max_items个后停止，
+        更旧的归档必然排在feed之外。无法由文件名确定日期的文件（如latest.md）全部解析。
+        """
+        parsed = []  # (原顺序索引, 文件信息)
+        dated = []   # (文件名日期, 原顺序索引, 文件路径)
+
+        def parse(index: int, file_path: Path) -> bool:
+            try:
+                file_info = self._parse_markdown_file(file_path)
+            except Exception as e:
+                logger.warning(f"解析Markdown文件失败 {file_path}: {e}")
+                return False
+            if file_info:
+                parsed.append((index, file_info))
+                return True
+            return False
+
+        for index, file_path in enumerate(markdown_files):
+            name_date = None if file_path.name == "latest.md" else _archive_date_from_name(file_path.name)
+            if name_date is None:
+                parse(index, file_path)
+            else:
+                dated.append((name_date, index, file_path))
+
+        # 稳定排序：同日期保持原顺序，与最终按日期取Top的结果一致
+        dated.sort(key=lambda entry: entry[0], reverse=True)
+        remaining = self.max_items
+        for _, index, file_path in dated:
+            if remaining <= 0:
+                break
+            if parse(index, file_path):
+                remaining -= 1
+
+        parsed.sort(key=lambda entry: entry[0])
+        return [file_info for _, file_info in parsed]
+
     def _determine_smart_switch_mode(self) -> tuple[str, Path]:
         """
         智能切换决策核心逻辑（共享）
@@ -220,15 +278,11 @@ class RSSGenerator:
     def _log_smart_switch_stats(self, file_infos: list[dict]):
         """记录智能切换的统计信息"""
         try:
-            latest_count = 0
-            archive_count = 0
-            
-            for file_info in file_infos:
-                file_path = file_info.get('file_path', '')
-                if file_path.endswith('latest.md'):
-                    latest_count += 1
-                else:
-                    archive_count += 1
+            # 文件只有latest与archive两类：统计latest数量，其余即为archive
+            latest_count = sum(
+                file_info.get('file_path', '').endswith('latest.md') for file_info in file_infos
+            )
+            archive_count = len(file_infos) - latest_count
             
             logger.info(f"智能切换统计: {archive_count}个archive文件, {latest_count}个latest文件")
             
@@ -247,10 +301,10 @@ class RSSGenerator:
         """
         markdown_files = []
         
-        # 收集archive目录中的所有文件
+        # 收集archive目录中的所有文件（文件名集合用于O(1)判断是否已收集）
         if self.archive_dir.exists():
-            for file_path in self.archive_dir.glob("*.md"):
-                markdown_files.append(file_path)
+            markdown_files.extend(self.archive_dir.glob("*.md"))
+        collected_archive_names = {file_path.name for file_path in markdown_files}
         
         # 处理latest.md文件（使用共享的智能切换决策逻辑）
         latest_file = self.docs_dir / "latest.md"
@@ -269,7 +323,7 @@ class RSSGenerator:
                 markdown_files.append(latest_file)
             elif mode == 'archive':
                 # 首次运行：使用archive文件
-                if archive_path and archive_path not in markdown_files:
+                if archive_path and archive_path.name not in collected_archive_names:
                     logger.info(f"智能切换：未找到对应archive文件，首次运行，使用archive文件")
                     markdown_files.append(archive_path)
                 elif not archive_path:
@@ -285,15 +339,6 @@ class RSSGenerator:
             
         return markdown_files
     
-    def _extract_date_from_latest(self, latest_file: Path) -> datetime:
-        """从latest.md文件中提取日期"""
-        try:
-            content = latest_file.read_text(encoding='utf-8')
-            return self._extract_datetime_from_content(content, include_time=False)
-        except Exception as e:
-            logger.error(f"从latest.md提取日期失败: {e}")
-            return None
-
     def _extract_datetime_from_latest(self, content: str) -> datetime:
         """从latest.md内容中提取完整的日期时间（含时分）"""
         return self._extract_datetime_from_content(content, include_time=True)
@@ -309,22 +354,13 @@ class RSSGenerator:
         Returns:
             datetime对象或None
         """
-        # 日期时间模式（含时分）
-        if include_time:
-            match = re.search(r'更新时间:\s*(\d{4})年(\d{2})月(\d{2})日\s*(\d{2}):(\d{2})', content)
+        # 按优先级依次尝试，首个匹配即返回（含时分的更新时间优先，即使它不是第一处更新时间）
+        patterns = _DATETIME_PATTERNS if include_time else _DATETIME_PATTERNS[1:]
+        for pattern in patterns:
+            match = pattern.search(content)
             if match:
                 return datetime(*map(int, match.groups()))
 
-        # 日期模式（仅年月日）
-        match = re.search(r'更新时间:\s*(\d{4})年(\d{2})月(\d{2})日', content)
-        if match:
-            return datetime(*map(int, match.groups()[:3]))
-
-        # 标题模式
-        match = re.search(r'#\s*(\d{4})年(\d{2})月(\d{2})日', content)
-        if match:
-            return datetime(*map(int, match.groups()))
-
         return None
     
     def _parse_markdown_file(self, file_path: Path) -> dict:
@@ -335,18 +371,20 @@ class RSSGenerator:
         content = file_path.read_text(encoding='utf-8')
         
         # 提取日期（使用增强的日期提取逻辑）
+        is_latest = file_path.name == "latest.md"
         file_date = self._extract_date_from_file(file_path, content)
+        # latest.md 的日期本身就是含时分的更新时间，标题和guid直接复用，不再重复扫描内容
+        pub_time = file_date if is_latest else None
         
         # 提取新闻数量
         news_count = 0
-        count_match = re.search(r'本期精选\s*\*\*(\d+)\*\*\s*条', content)
+        count_match = _NEWS_COUNT_PATTERN.search(content)
         if count_match:
             news_count = int(count_match.group(1))
         
         # 构建标题
-        if file_path.name == "latest.md":
+        if is_latest:
             # latest.md：标题包含时分信息（增量更新模式）
-            pub_time = self._extract_datetime_from_latest(content)
             if pub_time:
                 title = f"{pub_time.strftime('%Y年%m月%d日 %H:%M')} 新闻汇总"
             elif file_date:
@@ -360,13 +398,12 @@ class RSSGenerator:
             title = f"{file_path.stem} 新闻汇总"
         
         # 构建链接
-        repo_url = os.getenv('GITHUB_REPOSITORY', 'username/news')
-        username, repo = repo_url.split('/') if '/' in repo_url else ('username', 'news')
+        username, repo = _split_repository(os.getenv('GITHUB_REPOSITORY', 'username/news'))
         
         # 将Windows路径转换为POSIX路径用于URL
         file_path_posix = str(file_path).replace('\\', '/')
         
-        if file_path.name == "latest.md":
+        if is_latest:
             # latest.md 使用GitHub Pages URL
             link = f"https://{username}.github.io/{repo}/"
         else:
@@ -381,12 +418,8 @@ class RSSGenerator:
         
         # 使用文件路径作为唯一guid（POSIX格式）
         # latest.md 使用包含时间戳的 guid 以区分当天多次运行
-        if file_path.name == "latest.md":
-            pub_time = self._extract_datetime_from_latest(content)
-            if pub_time:
-                guid = f"{file_path_posix}#{pub_time.strftime('%Y-%m-%d-%H-%M')}"
-            else:
-                guid = file_path_posix
+        if is_latest and pub_time:
+            guid = f"{file_path_posix}#{pub_time.strftime('%Y-%m-%d-%H-%M')}"
         else:
             guid = file_path_posix
         
@@ -406,30 +439,16 @@ class RSSGenerator:
         """从文件内容中提取日期"""
         try:
             if file_path.name == "latest.md":
-                # latest.md: 尝试多种模式提取日期
-                patterns = [
-                    # 完整日期时间
-                    (r'更新时间:\s*(\d{4})年(\d{2})月(\d{2})日\s*(\d{2}):(\d{2})', 5),
-                    # 仅日期
-                    (r'更新时间:\s*(\d{4})年(\d{2})月(\d{2})日', 3),
-                    (r'#\s*(\d{4})年(\d{2})月(\d{2})日', 3),
-                ]
-                
-                for pattern, group_count in patterns:
-                    match = re.search(pattern, content)
-                    if match:
-                        nums = [int(match.group(i)) for i in range(1, group_count + 1)]
-                        if group_count == 5:
-                            return datetime(*nums)
-                        return datetime(*nums)
+                # latest.md: 按优先级尝试多种模式提取日期
+                extracted = self._extract_datetime_from_latest(content)
+                if extracted:
+                    return extracted
                 
                 logger.warning(f"无法从latest.md提取日期: {file_path}")
                 
             else:
                 # 归档文件: 从文件名提取日期 (YYYY-MM-DD.md)
-                match = re.match(r'(\d{4})-(\d{2})-(\d{2})\.md$', file_path.name)
-                if match:
-                    return datetime(*[int(x) for x in match.groups()])
+                return _archive_date_from_name(file_path.name)
             
             return None
             
@@ -443,8 +462,7 @@ class RSSGenerator:
         build_date = self._format_rfc822(now)
         
         # 获取GitHub仓库信息(从环境变量或配置文件)
-        repo_url = os.getenv('GITHUB_REPOSITORY', 'username/news')
-        username, repo = repo_url.split('/') if '/' in repo_url else ('username', 'news')
+        username, repo = _split_repository(os.getenv('GITHUB_REPOSITORY', 'username/news'))
         
         feed_url = f"https://{username}.github.io/{repo}/feed.xml"
         project_url = f"https://github.com/{username}/{repo}"
@@ -489,13 +507,13 @@ class RSSGenerator:
         # 获取完整内容并转换为HTML
         full_content = file_info.get('full_content', '')
 
-        # 删除重复的订阅部分（从## 订阅开始到文件结束）
-        subscription_pattern = r'##\s*📮\s*订阅.*$'
-        full_content = re.sub(subscription_pattern, '', full_content, flags=re.DOTALL)
+        # 删除重复的订阅部分（从## 订阅开始到文件结束，定位起点后直接截断）
+        subscription_match = _SUBSCRIPTION_PATTERN.search(full_content)
+        if subscription_match:
+            full_content = full_content[:subscription_match.start()]
 
         # 替换占位符
-        repo_url = os.getenv('GITHUB_REPOSITORY', 'username/news')
-        username, repo = repo_url.split('/') if '/' in repo_url else ('username', 'news')
+        username, repo = _split_repository(os.getenv('GITHUB_REPOSITORY', 'username/news'))
         full_content = full_content.replace('{username}', username)
         full_content = full_content.replace('{repo}', repo)
 
@@ -519,12 +537,7 @@ class RSSGenerator:
     
     def _format_rfc822(self, dt: datetime) -> str:
         """格式化为RFC822日期格式"""
-        # 使用英文月份缩写
-        months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
-                  'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-        days = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-        
-        day_name = days[dt.weekday()]
-        month_name = months[dt.month - 1]
+        day_name = _RFC822_DAYS[dt.weekday()]
+        month_name = _RFC822_MONTHS[dt.month - 1]
         
         return f"{day_name}, {dt.day:02d} {month_name} {dt.year} {dt.hour:02d}:{dt.minute:02d}:{dt.second:02d} GMT"